@@ -1,8 +1,7 @@
 import os
-from langchain_openai import ChatOpenAI
-from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import HumanMessage, SystemMessage
-from tools import search_kurals, get_kural_explanation, get_random_kural_by_category
+import uuid
+import threading
+from router import route, user_text
 from dotenv import load_dotenv
 
 # Load .env from the same directory as this script
@@ -28,8 +27,14 @@ CRITICAL INSTRUCTIONS FOR TAMIL LANGUAGE:
 CAPABILITIES:
 - You can search for Kurals related to any concept or word using the 'search_kurals' tool.
   Use this when the user asks about a topic, concept, or word.
+- When a question spans several concepts (e.g. "patience and anger", or comparing two virtues), use the
+  'search_kurals_batch' tool ONCE with one query per concept instead of calling 'search_kurals' repeatedly.
 - You can provide deep explanations using the 'get_kural_explanation' tool.
   Use this when the user provides a specific Kural ID number.
+- You can find Kurals similar to one already discussed using the 'related_kurals' tool with its ID.
+  Use this for "more like this" or "similar kurals" follow-ups instead of searching again.
+- You can identify a Kural from a line of its verse using the 'find_kural_by_verse' tool.
+  Use this when the user quotes or half-remembers the words of a Kural, in Tamil or transliteration.
 - You can pick random Kurals from specific categories using the 'get_random_kural_by_category' tool.
   Use this when the user asks for a random kural or one from a specific Paal (section).
 
@@ -39,7 +44,7 @@ CONVERSATION STYLE:
 - If they provide an ID, use the explanation tool for the full explanation block.
 - If they ask for a random kural, use the random tool.
 - Always maintain history and context of the conversation.
-- CRITICAL: Treat each user follow-up question as a NEW search query. ALWAYS use the 'search_kurals' tool again to find the most relevant Kurals for the new question. Do not assume the Kural from the previous turn is the answer to the new question.
+- CRITICAL: Treat each user follow-up question as a NEW search query. ALWAYS use the 'search_kurals' tool again to find the most relevant Kurals for the new question. Do not assume the Kural from the previous turn is the answer to the new question. The one exception is a request for Kurals similar to one already shown: use 'related_kurals' with its ID.
 - If the user writes in Tamil, respond primarily in Tamil with English translations.
 - If the user writes in English, respond primarily in English with Tamil originals included.
 
@@ -51,21 +56,149 @@ The three sections (Paal) of Thirukural are:
 3. காமத்துப்பால் (Kaamathuppaal) - Love
 """
 
+# Compiled graph shared by all sessions; it holds no per-conversation state
+_shared_agent = None
+_agent_lock = threading.Lock()
+
+def get_shared_agent():
+    global _shared_agent
+    if _shared_agent is None:
+        with _agent_lock:
+            if _shared_agent is None:
+                _shared_agent = get_thirukural_agent()
+    return _shared_agent
+
 def get_thirukural_agent():
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    # Imported here rather than at module level so the UI can render before LangGraph/OpenAI load
+    from langgraph.graph import StateGraph, MessagesState, START, END
+    from langgraph.prebuilt import create_react_agent
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+    from langchain_core.runnables import RunnableLambda
+    from tools import (search_kurals, search_kurals_batch, get_kural_explanation, related_kurals,
+                       find_kural_by_verse, get_random_kural_by_category, identify_verse)
+    from clients import get_llm
     
-    tools = [search_kurals, get_kural_explanation, get_random_kural_by_category]
+    llm = get_llm()
     
-    agent = create_react_agent(
+    tools = [search_kurals, search_kurals_batch, get_kural_explanation, related_kurals, find_kural_by_verse,
+             get_random_kural_by_category]
+    tools_by_name = {t.name: t for t in tools}
+    
+    react_agent = create_react_agent(
         llm, 
         tools,
         prompt=SYSTEM_PROMPT,
     )
     
-    return agent
+    # Fast path: explicit "explain kural N" / "random kural" requests, and messages that quote a kural's verse,
+    # skip the tool-picking LLM turn.
+    # The tool runs directly and is recorded as if the model had called it, so one LLM call formats the answer.
+    formatter = llm.bind_tools(tools, tool_choice="none")
+    
+    def route_decision(state: MessagesState):
+        last = state["messages"][-1]
+        if not isinstance(last, HumanMessage):
+            return None
+        previous = next((m.content for m in reversed(state["messages"][:-1])
+                         if isinstance(m, AIMessage) and m.content), None)
+        decision = route(last.content, previous)
+        if decision is None:
+            # Only a message that is mostly verse text matches, so questions about a topic still reach the LLM
+            kural_id = identify_verse(user_text(last.content))
+            if kural_id is not None:
+                decision = ("get_kural_explanation", {"kural_id": kural_id})
+        return decision
+    
+    def routed_messages(name, args, result):
+        call_id = f"route_{uuid.uuid4().hex}"
+        return {"messages": [
+            AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": call_id}]),
+            ToolMessage(content=result, tool_call_id=call_id, name=name),
+        ]}
+    
+    def route_request(state: MessagesState):
+        decision = route_decision(state)
+        if decision is None:
+            return {}
+        name, args = decision
+        return routed_messages(name, args, tools_by_name[name].invoke(args))
+    
+    async def aroute_request(state: MessagesState):
+        decision = route_decision(state)
+        if decision is None:
+            return {}
+        name, args = decision
+        return routed_messages(name, args, await tools_by_name[name].ainvoke(args))
+    
+    def format_answer(state: MessagesState):
+        return {"messages": [formatter.invoke([SystemMessage(content=SYSTEM_PROMPT)] + state["messages"])]}
+    
+    async def aformat_answer(state: MessagesState):
+        return {"messages": [await formatter.ainvoke([SystemMessage(content=SYSTEM_PROMPT)] + state["messages"])]}
+    
+    def next_step(state: MessagesState):
+        return "format_answer" if isinstance(state["messages"][-1], ToolMessage) else "agent"
+    
+    graph = StateGraph(MessagesState)
+    # Each node has a sync and an async body so both invoke() and ainvoke() avoid blocking
+    graph.add_node("route_request", RunnableLambda(route_request, afunc=aroute_request))
+    graph.add_node("format_answer", RunnableLambda(format_answer, afunc=aformat_answer))
+    graph.add_node("agent", react_agent)
+    graph.add_edge(START, "route_request")
+    graph.add_conditional_edges("route_request", next_step, ["format_answer", "agent"])
+    graph.add_edge("format_answer", END)
+    graph.add_edge("agent", END)
+    
+    return graph.compile()
+
+# Progress text shown while a tool runs
+TOOL_STATUS = {
+    "search_kurals": "Searching kurals…",
+    "search_kurals_batch": "Searching kurals for each topic…",
+    "get_kural_explanation": "Opening the explanation…",
+    "related_kurals": "Finding related kurals…",
+    "find_kural_by_verse": "Looking up the verse…",
+    "get_random_kural_by_category": "Picking a kural…",
+}
+
+def stream_agent(agent, messages, config=None):
+    """Streams a reply. Yields ("status", text) when a tool is called and
+    ("token", text) for each piece of model output."""
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    
+    seen_calls = set()
+    streamed = set()
+    # subgraphs=True: the ReAct agent is a subgraph, and its model tokens are not streamed otherwise
+    for _, (chunk, metadata) in agent.stream({"messages": messages}, config=config, stream_mode="messages",
+                                             subgraphs=True):
+        if isinstance(chunk, AIMessageChunk):
+            for call in chunk.tool_call_chunks or []:
+                if call.get("name"):
+                    seen_calls.add(call.get("id"))
+                    yield "status", TOOL_STATUS.get(call["name"], "Consulting the manuscripts…")
+            if chunk.content:
+                streamed.add(chunk.id)
+                yield "token", chunk.content
+        elif isinstance(chunk, AIMessage):
+            # Tool calls made by the fast-path router arrive as whole messages
+            for call in chunk.tool_calls:
+                if call["id"] not in seen_calls:
+                    seen_calls.add(call["id"])
+                    yield "status", TOOL_STATUS.get(call["name"], "Consulting the manuscripts…")
+            # So does the reply of a model that did not stream
+            if chunk.content and chunk.id not in streamed:
+                streamed.add(chunk.id)
+                yield "token", chunk.content
+
+async def ainvoke_agent(messages, agent=None, config=None):
+    """Async entry point for one turn. Many conversations can await this on a
+    single event loop; tools and LLM calls use the shared async connection pool."""
+    agent = agent or get_shared_agent()
+    return await agent.ainvoke({"messages": messages}, config=config)
 
 if __name__ == "__main__":
     # Test run
+    from langchain_core.messages import HumanMessage
     agent = get_thirukural_agent()
     result = agent.invoke({"messages": [HumanMessage(content="What does Thirukural say about love?")]})
     print(result["messages"][-1].content)
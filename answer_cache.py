@@ -0,0 +1,182 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_ROOT = os.getenv("INDEX_ROOT", BASE_DIR)
+ANSWER_CACHE_PATH = os.path.join(INDEX_ROOT, "cache", "answers.sqlite3")
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "1") == "1"
+# Cosine similarity a new question needs to reuse a cached answer
+SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_S", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+# Eviction trims the cache to this share of MAX_ENTRIES, so the matrix rebuild it needs
+# happens once per many inserts rather than on every insert once the cache is full
+EVICTION_TARGET = 0.9
+
+_TAMIL_RE = re.compile(r"[\u0B80-\u0BFF]")
+
+
+def response_language(question: str) -> str:
+    """The agent answers Tamil questions primarily in Tamil, so answers are cached per language."""
+    return "ta" if _TAMIL_RE.search(question) else "en"
+
+
+def is_cacheable(question: str) -> bool:
+    """Questions the router answers are never cached: they are cheap already, random
+    kurals must stay random, and "kural 391" and "kural 392" embed almost alike."""
+    from router import route
+    return route(question) is None
+
+
+class SemanticAnswerCache:
+    """Answers to first-turn questions, matched by embedding similarity.
+
+    Entries live in SQLite so they survive restarts; their vectors are mirrored in an
+    in-memory matrix per language for a single vectorized similarity scan. Entries
+    expire after `ttl` seconds and the least recently used are evicted beyond
+    `max_entries`."""
+
+    def __init__(self, embeddings, path: str = ANSWER_CACHE_PATH, threshold: float = SIMILARITY_THRESHOLD,
+                 ttl: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        import numpy as np
+        self._np = np
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, language TEXT, question TEXT, vector BLOB, "
+            "answer TEXT, created_at REAL, last_used REAL)"
+        )
+        try:
+            # Caches created before answers were tagged with the embedding model
+            self._db.execute("ALTER TABLE answers ADD COLUMN model TEXT")
+        except sqlite3.OperationalError:
+            pass
+        self._db.commit()
+        self._reload()
+
+    @property
+    def model(self) -> str:
+        # Vectors from different embedding models are not comparable
+        return getattr(self.embeddings, "model_name", "")
+
+    def _reload(self):
+        """Rebuilds the per-language matrices from the database, dropping expired rows first."""
+        np = self._np
+        self._db.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl,))
+        self._db.commit()
+        self._rows: Dict[str, list] = {}
+        vectors: Dict[str, list] = {}
+        rows = self._db.execute("SELECT id, language, vector FROM answers WHERE model = ?", (self.model,))
+        for row_id, language, blob in rows:
+            self._rows.setdefault(language, []).append(row_id)
+            vectors.setdefault(language, []).append(np.frombuffer(blob, dtype=np.float32))
+        # Each matrix is a view of the filled rows of a larger buffer that new entries are appended to
+        self._buffers = {lang: np.vstack(vecs) for lang, vecs in vectors.items()}
+        self._matrices = dict(self._buffers)
+        (self._count,) = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()
+
+    def _append(self, language: str, row_id: int, vec):
+        """Adds one stored row to the in-memory matrix. The buffer doubles when full, so an
+        insert costs amortized O(dimensions) instead of a rebuild from the database."""
+        rows = self._rows.setdefault(language, [])
+        buffer = self._buffers.get(language)
+        n = len(rows)
+        if buffer is None or n == len(buffer):
+            grown = self._np.empty((max(16, 2 * n), len(vec)), dtype=self._np.float32)
+            if n:
+                grown[:n] = buffer[:n]
+            self._buffers[language] = buffer = grown
+        buffer[n] = vec
+        rows.append(row_id)
+        self._matrices[language] = buffer[:n + 1]
+
+    def _embed(self, question: str):
+        np = self._np
+        vec = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        return vec / (np.linalg.norm(vec) or 1.0)
+
+    def lookup(self, question: str) -> Optional[str]:
+        language = response_language(question)
+        vec = self._embed(question)
+        with self._lock:
+            matrix = self._matrices.get(language)
+            if matrix is not None:
+                scores = matrix @ vec
+                best = int(scores.argmax())
+                if scores[best] >= self.threshold:
+                    row_id = self._rows[language][best]
+                    row = self._db.execute(
+                        "SELECT answer, created_at FROM answers WHERE id = ?", (row_id,)).fetchone()
+                    if row is not None and time.time() - row[1] <= self.ttl:
+                        self._db.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), row_id))
+                        self._db.commit()
+                        self.hits += 1
+                        return row[0]
+                    # Expired since the last reload
+                    self._reload()
+            self.misses += 1
+        return None
+
+    def store(self, question: str, answer: str):
+        language = response_language(question)
+        vec = self._embed(question)
+        now = time.time()
+        with self._lock:
+            row_id = self._db.execute(
+                "INSERT INTO answers (model, language, question, vector, answer, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.model, language, question, array("f", vec.tolist()).tobytes(), answer, now, now),
+            ).lastrowid
+            self._count += 1
+            if self._count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_used ASC LIMIT ?)",
+                    (self._count - int(self.max_entries * EVICTION_TARGET),),
+                )
+                self._db.commit()
+                self._reload()
+            else:
+                self._db.commit()
+                self._append(language, row_id, vec)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": sum(len(rows) for rows in self._rows.values()),
+        }
+
+
+# Process-wide cache, created on first use
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Returns the shared cache, or None when ANSWER_CACHE is turned off."""
+    global _answer_cache
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                from tools import get_query_embeddings
+                _answer_cache = SemanticAnswerCache(get_query_embeddings())
+    return _answer_cache
@@ -1,10 +1,21 @@
+import sys
+
+# `python app.py --profile-startup` reports import and initialization costs instead of serving the UI
+if __name__ == "__main__" and "--profile-startup" in sys.argv:
+    from startup_profile import main
+    sys.exit(main(sys.argv[1:]))
+
 import streamlit as st
 import os
+import math
 import random
-from PIL import Image
+import time
 from dotenv import load_dotenv
-from agent import get_thirukural_agent
-from langchain_core.messages import HumanMessage, AIMessage
+from agent import get_shared_agent, stream_agent
+from streaming import renderable_html
+from answer_cache import get_answer_cache, is_cacheable
+from history import compact_history
+from tracing import trace, span, start_metrics_server
 
 # Load environment variables
 load_dotenv()
@@ -43,17 +54,17 @@ st.set_page_config(
 )
 
 # --- Social Sharing (Open Graph) Tips ---
-st.markdown("""
+OG_META = """
     <style>
     /* Attempt to inject metadata for social scrapers */
     meta[property="og:title"] { content: "Thirukural Scholar - Ancient Wisdom AI"; }
     meta[property="og:description"] { content: "Explore the timeless wisdom of Thirukural with an AI companion. Ask about life, love, and virtue."; }
     meta[property="og:image"] { content: "https://raw.githubusercontent.com/SiddharthRavikumar1989/ThirukuralLLM/main/assets/icon.png"; }
     </style>
-    """, unsafe_allow_html=True)
+    """
 
 # --- Custom CSS for Warm/Classic UI ---
-st.markdown("""
+APP_CSS = """
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Noto+Sans+Tamil:wght@400;500;700&family=Lora:ital,wght@0,400;0,700;1,400&family=Cinzel:wght@600&display=swap');
 
@@ -285,10 +296,10 @@ st.markdown("""
         }
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
 # --- Top Right Badge ---
-st.markdown('<div class="tamil-vellum-badge">தமிழ் வெல்லும்</div>', unsafe_allow_html=True)
+BADGE_HTML = '<div class="tamil-vellum-badge">தமிழ் வெல்லும்</div>'
 
 # --- Floating Background Words ---
 tamil_words = [
@@ -297,24 +308,44 @@ tamil_words = [
     'சான்றாண்மை', 'நல்குரவு', 'நாடு', 'அரண்', 'படை'
 ]
 
-background_html = ""
-for _ in range(25):
-    word = random.choice(tamil_words)
-    top = random.randint(5, 95)
-    left = random.randint(5, 95)
-    duration = random.randint(12, 20)
-    delay = random.randint(0, 5)
-    size = random.randint(20, 32)
-    
-    background_html += f"""
-    <div class="floating-word" style="
-        top: {top}vh; 
-        left: {left}vw; 
-        animation: float {duration}s ease-in-out {delay}s infinite;
-        font-size: {size}px;
-    ">{word}</div>
-    """
-st.markdown(background_html, unsafe_allow_html=True)
+# A fixed seed keeps the words in place across reruns, so the browser does not redraw them or restart their animations
+BACKGROUND_SEED = 1330
+
+@st.cache_data(show_spinner=False)
+def chrome_html(seed: int = BACKGROUND_SEED) -> str:
+    """The page's static chrome (meta, CSS, badge, background), built once and sent as one element."""
+    rng = random.Random(seed)
+    background_html = ""
+    for _ in range(25):
+        word = rng.choice(tamil_words)
+        top = rng.randint(5, 95)
+        left = rng.randint(5, 95)
+        duration = rng.randint(12, 20)
+        delay = rng.randint(0, 5)
+        size = rng.randint(20, 32)
+        
+        background_html += f"""
+        <div class="floating-word" style="
+            top: {top}vh; 
+            left: {left}vw; 
+            animation: float {duration}s ease-in-out {delay}s infinite;
+            font-size: {size}px;
+        ">{word}</div>
+        """
+    return OG_META + APP_CSS + BADGE_HTML + background_html
+
+st.markdown(chrome_html(), unsafe_allow_html=True)
+
+@st.cache_resource(show_spinner=False)
+def load_image(path: str):
+    """Image bytes read once per process; None if the file is missing."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+# Valluvar's portrait, else the app icon
+assistant_avatar = load_image("thiruvalluvar.jpg") or load_image("assets/icon.png")
 
 
 # --- Sidebar ---
@@ -322,10 +353,10 @@ with st.sidebar:
     st.markdown('<div class="sidebar-counselor-title">Valluvar is your Counsellor</div>', unsafe_allow_html=True)
     
     # Load and display the image directly if it exists
-    if os.path.exists("thiruvalluvar.jpg"):
-        st.image("thiruvalluvar.jpg", use_container_width=True, caption="Universal Teacher")
-    elif os.path.exists("assets/icon.png"):
-        st.image("assets/icon.png", use_container_width=True, caption="Symbol of Wisdom")
+    if load_image("thiruvalluvar.jpg"):
+        st.image(load_image("thiruvalluvar.jpg"), use_container_width=True, caption="Universal Teacher")
+    elif load_image("assets/icon.png"):
+        st.image(load_image("assets/icon.png"), use_container_width=True, caption="Symbol of Wisdom")
     
     st.markdown("---")
     st.markdown("### 💡 Guidance for You:")
@@ -349,15 +380,15 @@ with st.sidebar:
     st.markdown("---")
     if st.button("🔄 Start New Conversation", use_container_width=True):
         st.session_state.messages = []
-        st.session_state.agent = get_thirukural_agent()
+        st.session_state.history_page = 0
         st.rerun()
 
 
 # --- Header Section ---
 col1, col2 = st.columns([0.8, 10]) 
 with col1:
-    if os.path.exists("assets/icon.png"):
-        st.image("assets/icon.png", width=90)
+    if load_image("assets/icon.png"):
+        st.image(load_image("assets/icon.png"), width=90)
     else:
         st.markdown("## 📜")
 
@@ -367,48 +398,71 @@ with col2:
 
 # --- Logic ---
 
-# Initialize Agent
-if "agent" not in st.session_state:
-    with st.spinner("Opening the Ancient Manuscripts..."):
-        try:
-            st.session_state.agent = get_thirukural_agent()
-        except Exception as e:
-            st.error(f"Failed to initialize: {e}")
+# Prometheus metrics endpoint (only when METRICS_PORT is set)
+start_metrics_server()
+
+# Initialize Agent (one compiled graph and client pool per process; sessions only keep their messages)
+@st.cache_resource(show_spinner="Opening the Ancient Manuscripts...")
+def load_agent():
+    return get_shared_agent()
+
+agent = None
+try:
+    agent = load_agent()
+except Exception as e:
+    st.error(f"Failed to initialize: {e}")
 
 # Display Chat History
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-for message in st.session_state.messages:
+# History is shown a page at a time (newest first), so a rerun costs the same at turn 1 and turn 200
+HISTORY_PAGE_MESSAGES = 20
+
+def render_message(message):
     if message["role"] == "user":
         with st.chat_message("user"):
             st.markdown(message["content"])
     else:
-        avatar = None
-        if os.path.exists("thiruvalluvar.jpg"):
-            avatar = "thiruvalluvar.jpg"
-        elif os.path.exists("assets/icon.png"):
-            avatar = "assets/icon.png"
-            
-        with st.chat_message("assistant", avatar=avatar):
+        with st.chat_message("assistant", avatar=assistant_avatar):
              st.markdown(f'<div class="explanation-text">{message["content"]}</div>', unsafe_allow_html=True)
 
+@st.fragment
+def chat_history():
+    """Paging through older turns reruns only this fragment, not the whole app."""
+    messages = st.session_state.messages
+    pages = max(1, math.ceil(len(messages) / HISTORY_PAGE_MESSAGES))
+    page = min(st.session_state.get("history_page", 0), pages - 1)
+    end = len(messages) - page * HISTORY_PAGE_MESSAGES
+    start = max(0, end - HISTORY_PAGE_MESSAGES)
+    
+    if pages > 1:
+        older, label, newer = st.columns([1, 4, 1])
+        if older.button("◀ Older", disabled=start == 0, key="history_older", use_container_width=True):
+            st.session_state.history_page = page + 1
+            st.rerun(scope="fragment")
+        label.caption(f"Messages {start + 1}–{end} of {len(messages)}")
+        if newer.button("Newer ▶", disabled=page == 0, key="history_newer", use_container_width=True):
+            st.session_state.history_page = page - 1
+            st.rerun(scope="fragment")
+    
+    for message in messages[start:end]:
+        render_message(message)
+
+chat_history()
+
 # User Input
 if prompt := st.chat_input("Ask about Life, Love, Politics, Confusion and anything that troubles you"):
-    # Add user message
+    # Add user message; the history jumps back to the newest page
     st.session_state.messages.append({"role": "user", "content": prompt})
+    st.session_state.history_page = 0
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Prepare LangChain messages
-    langchain_msgs = []
-    history_window = st.session_state.messages[-10:] 
-    for msg in history_window:
-         if msg["role"] == "user":
-             langchain_msgs.append(HumanMessage(content=msg["content"]))
-         else:
-             langchain_msgs.append(AIMessage(content=msg["content"]))
-             
+    # Prepare LangChain messages: history is stripped of HTML and compacted to a token budget
+    from langchain_core.messages import HumanMessage
+    langchain_msgs, history_report = compact_history(st.session_state.messages)
+    
     # INSTRUCTION INJECTION
     if langchain_msgs and isinstance(langchain_msgs[-1], HumanMessage):
         original_content = langchain_msgs[-1].content
@@ -426,20 +480,92 @@ if prompt := st.chat_input("Ask about Life, Love, Politics, Confusion and anythi
         langchain_msgs[-1].content = f"{original_content} {instruction}"
     
     # Generate Response
-    if "agent" in st.session_state:
-        avatar = None
-        if os.path.exists("thiruvalluvar.jpg"):
-            avatar = "thiruvalluvar.jpg"
-        elif os.path.exists("assets/icon.png"):
-            avatar = "assets/icon.png"
-            
-        with st.chat_message("assistant", avatar=avatar):
-            with st.spinner("The Scholar is thinking..."):
-                try:
-                    result = st.session_state.agent.invoke({"messages": langchain_msgs})
-                    output = result["messages"][-1].content
-                    
-                    st.markdown(f'<div class="explanation-text">{output}</div>', unsafe_allow_html=True)
+    if agent is not None:
+        with st.chat_message("assistant", avatar=assistant_avatar):
+            status = st.empty()
+            placeholder = st.empty()
+            status.caption("The Scholar is thinking...")
+            try:
+                # Every LLM call, tool call, embedding and vector query in this turn is recorded as a span
+                with trace("chat_turn", turn=len(st.session_state.messages),
+                           history_raw_tokens=history_report.raw_tokens,
+                           history_tokens=history_report.compacted_tokens,
+                           history_tokens_saved=history_report.saved,
+                           history_turns_summarized=history_report.summarized_turns) as turn_trace:
+                    output = ""
+                    started = time.perf_counter()
+                    first_token_at = None
+                    last_render = 0.0
+                
+                    # Opening questions are often near-duplicates; reuse a cached answer when one is close enough
+                    answer_cache = get_answer_cache() if len(st.session_state.messages) == 1 and is_cacheable(prompt) else None
+                    with span("answer_cache", "cache") as cache_span:
+                        cached = answer_cache.lookup(prompt) if answer_cache else None
+                        cache_span["cache_hit"] = cached is not None
+                    replies = ([("token", cached)] if cached is not None
+                               else stream_agent(agent, langchain_msgs, config={"callbacks": turn_trace.callbacks()}))
+                
+                    for kind, text in replies:
+                        if kind == "status":
+                            # Anything streamed before a tool call is preamble, not the answer
+                            output = ""
+                            placeholder.empty()
+                            status.caption(text)
+                            continue
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        output += text
+                        # Re-rendering on every token is wasteful; refresh a few times per second
+                        if time.perf_counter() - last_render > 0.05:
+                            status.empty()
+                            placeholder.markdown(f'<div class="explanation-text">{renderable_html(output)}</div>', unsafe_allow_html=True)
+                            last_render = time.perf_counter()
+                
+                    status.empty()
+                    placeholder.markdown(f'<div class="explanation-text">{output}</div>', unsafe_allow_html=True)
                     st.session_state.messages.append({"role": "assistant", "content": output})
-                except Exception as e:
+                    if answer_cache and cached is None and output:
+                        answer_cache.store(prompt, output)
+                
+                    total = time.perf_counter() - started
+                    ttft = (first_token_at - started) if first_token_at else total
+                    st.session_state.last_turn_metrics = {"time_to_first_token_s": ttft, "total_s": total,
+                                                          "answer_cache_hit": cached is not None,
+                                                          "history_tokens": history_report.compacted_tokens,
+                                                          "history_tokens_saved": history_report.saved}
+                    # Exported with the trace; cache hits and misses are counted by the answer_cache span
+                    turn_trace.attrs.update(time_to_first_token_s=ttft, answer_cache_hit=cached is not None)
+                st.session_state.last_trace = turn_trace.to_dict()
+            except Exception as e:
+                status.empty()
+                if getattr(e, "status_code", None) == 429:
+                    # Still rate limited after the scheduler's retries
+                    st.error("The service is busy right now. Please try again in a few seconds.")
+                else:
                     st.error(f"An error occurred: {e}")
+
+# --- Debug Panel ---
+# Enable with DEBUG_PANEL=1 or by opening the app with ?debug=1
+if os.getenv("DEBUG_PANEL") == "1" or st.query_params.get("debug") == "1":
+    last_trace = st.session_state.get("last_trace")
+    with st.sidebar:
+        st.markdown("---")
+        st.markdown("### 🔍 Last answer breakdown")
+        if last_trace:
+            st.caption(f"Total {last_trace['duration_s'] * 1000:.0f} ms")
+            st.dataframe(
+                [{
+                    "span": f"{s['kind']}: {s['name']}",
+                    "start ms": round(s.get("offset_s", 0.0) * 1000),
+                    "ms": round(s["duration_s"] * 1000, 1),
+                    "tokens in": s.get("input_tokens"),
+                    "tokens out": s.get("output_tokens"),
+                    "cache hit": s.get("cache_hit"),
+                } for s in sorted(last_trace["spans"], key=lambda s: s.get("offset_s", 0.0))],
+                hide_index=True,
+                use_container_width=True,
+            )
+            if st.session_state.get("last_turn_metrics"):
+                st.json(st.session_state.last_turn_metrics, expanded=False)
+        else:
+            st.caption("Ask a question to see where the time goes.")
@@ -0,0 +1,220 @@
+"""Answers a file of questions with the Thirukural agent, for pre-generating FAQ
+answers and for evaluation runs.
+
+Input is JSONL with one {"id": ..., "question": ...} object per line (`id` defaults
+to the line number). Each answer is appended to the output JSONL as soon as it is
+ready, so the output doubles as the checkpoint: re-running with the same output
+file skips questions already answered and retries ones that failed.
+
+    python batch_qa.py questions.jsonl answers.jsonl [--concurrency 8] [--limit 100]
+
+All questions share one compiled agent, one vector index and the pooled OpenAI
+clients; requests pass through the rate-limit scheduler like the app's.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+
+# Questions in flight at once
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+# Seconds between progress lines
+PROGRESS_INTERVAL = 10.0
+
+
+def read_questions(path: str) -> List[Dict]:
+    items, seen = [], set()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            question = str(item.get("question", "")).strip()
+            if not question:
+                raise ValueError(f"{path}:{line_no}: missing \"question\"")
+            item_id = str(item.get("id", line_no))
+            if item_id in seen:
+                raise ValueError(f"{path}:{line_no}: duplicate id {item_id!r}")
+            seen.add(item_id)
+            items.append({**item, "id": item_id, "question": question})
+    return items
+
+
+def answered_ids(path: str) -> set:
+    """IDs with an answer in an earlier run's output. A line cut short by an interruption is ignored."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("answer") and not record.get("error"):
+                done.add(str(record["id"]))
+    return done
+
+
+def _open_output(path: str):
+    # Start on a fresh line if the previous run died mid-write
+    partial = False
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            partial = f.read(1) != b"\n"
+    out = open(path, "a", encoding="utf-8")
+    if partial:
+        out.write("\n")
+    return out
+
+
+def _usage(messages) -> Dict[str, int]:
+    usage = {"input_tokens": 0, "output_tokens": 0}
+    for m in messages:
+        for key in usage:
+            usage[key] += (getattr(m, "usage_metadata", None) or {}).get(key, 0)
+    return usage
+
+
+class BatchStats:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latencies: List[float] = []
+        self.started = time.perf_counter()
+
+    def add(self, record: Dict):
+        self.done += 1
+        if record.get("error"):
+            self.failed += 1
+            return
+        self.latencies.append(record["latency_s"])
+        self.input_tokens += record["input_tokens"]
+        self.output_tokens += record["output_tokens"]
+
+    def summary(self) -> Dict:
+        wall = time.perf_counter() - self.started
+        ordered = sorted(self.latencies)
+        pct = lambda p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else None
+        return {
+            "questions": self.total,
+            "answered": self.done - self.failed,
+            "failed": self.failed,
+            "wall_s": round(wall, 2),
+            "questions_per_min": round(self.done / wall * 60, 2) if wall else 0.0,
+            "latency_p50_s": pct(50),
+            "latency_p95_s": pct(95),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "tokens_per_s": round((self.input_tokens + self.output_tokens) / wall, 1) if wall else 0.0,
+        }
+
+    def progress(self) -> str:
+        s = self.summary()
+        return (f"{self.done}/{self.total} done ({s['failed']} failed), "
+                f"{s['questions_per_min']:.1f} questions/min, {s['input_tokens']} in / {s['output_tokens']} out tokens")
+
+
+async def answer(agent, item: Dict) -> Dict:
+    from langchain_core.messages import AIMessage, HumanMessage
+    from agent import ainvoke_agent
+
+    started = time.perf_counter()
+    record = {"id": item["id"], "question": item["question"]}
+    try:
+        result = await ainvoke_agent([HumanMessage(content=item["question"])], agent=agent)
+    except Exception as e:
+        return {**record, "error": f"{type(e).__name__}: {e}", "latency_s": round(time.perf_counter() - started, 3)}
+    new_messages = result["messages"][1:]
+    return {
+        **record,
+        "answer": result["messages"][-1].content,
+        "tools": [c["name"] for m in new_messages if isinstance(m, AIMessage) for c in m.tool_calls],
+        **_usage(new_messages),
+        "latency_s": round(time.perf_counter() - started, 3),
+    }
+
+
+async def run_batch(items: List[Dict], output_path: str, concurrency: int = BATCH_CONCURRENCY) -> Dict:
+    """Answers `items`, appending each result to `output_path`. Returns the run summary."""
+    from agent import get_shared_agent
+    from tools import get_search_backend, get_lexical_index, get_verse_index, SEARCH_MODE
+
+    agent = get_shared_agent()
+    # Load the indexes once up front rather than inside the first wave of questions
+    await asyncio.to_thread(get_lexical_index)
+    await asyncio.to_thread(get_verse_index)
+    if SEARCH_MODE != "lexical":
+        await asyncio.to_thread(get_search_backend)
+
+    stats = BatchStats(len(items))
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+
+    with _open_output(output_path) as out:
+        async def worker():
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                record = await answer(agent, item)
+                # One whole line per answer, flushed at once, so a crash loses at most the answers in flight
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                stats.add(record)
+
+        async def report():
+            while True:
+                await asyncio.sleep(PROGRESS_INTERVAL)
+                print(stats.progress(), file=sys.stderr)
+
+        reporter = asyncio.create_task(report())
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(items))))))
+        finally:
+            reporter.cancel()
+    return stats.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL file of {\"id\", \"question\"} objects")
+    parser.add_argument("output", help="JSONL file answers are appended to; also the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--limit", type=int, help="Answer at most this many of the remaining questions")
+    parser.add_argument("--summary", help="Also write the run summary to this JSON file")
+    args = parser.parse_args()
+
+    items = read_questions(args.input)
+    done = answered_ids(args.output)
+    pending = [item for item in items if item["id"] not in done]
+    already = len(items) - len(pending)
+    if args.limit is not None:
+        pending = pending[:args.limit]
+    print(f"{len(items)} questions, {already} already answered; "
+          f"answering {len(pending)} with concurrency {args.concurrency}", file=sys.stderr)
+
+    summary = {**asyncio.run(run_batch(pending, args.output, args.concurrency)), "already_answered": already}
+    print(json.dumps(summary, indent=2))
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Drives many concurrent conversations through agent.ainvoke_agent on one event
+loop, with latency-injecting fake LLM and embeddings. Fails (exit 1) if any
+conversation errors or does not return a formatted kural, or if the batch takes
+much longer than a single conversation would, i.e. turns were serialized.
+
+    python -m benchmarks.async_conversations [--conversations 50] [--llm-latency 0.2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUESTIONS = [
+    "What does Kural say about learning?",
+    "How to manage money wisely?",
+    "What is the sign of true love?",
+    "How to choose good friends?",
+    "உழவு பற்றி என்ன சொல்கிறது?",
+    "explain kural 391",
+    "give me a random kural on love",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--max-slowdown", type=float, default=3.0,
+                        help="Allowed ratio of batch wall time to one conversation's time")
+    args = parser.parse_args()
+
+    # Keep indexes and caches built with fake vectors out of the real ones
+    os.environ.setdefault("INDEX_ROOT", tempfile.mkdtemp(prefix="thirukural-bench-"))
+    os.environ.setdefault("VECTOR_BACKEND", "numpy")
+
+    from benchmarks.fakes import install_fakes
+    from langchain_core.messages import HumanMessage
+    import agent
+    import ingest
+    import tools
+
+    llm, _ = install_fakes(args.llm_latency, args.embedding_latency)
+    ingest.ingest_data()
+    tools.get_search_backend()
+    shared = agent.get_shared_agent()
+
+    async def one(question):
+        result = await agent.ainvoke_agent([HumanMessage(content=question)], agent=shared)
+        return result["messages"][-1].content
+
+    async def run_all():
+        start = time.perf_counter()
+        await one(QUESTIONS[0])
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        answers = await asyncio.gather(
+            *(one(QUESTIONS[i % len(QUESTIONS)]) for i in range(args.conversations)),
+            return_exceptions=True,
+        )
+        return single, time.perf_counter() - start, answers
+
+    single, wall, answers = asyncio.run(run_all())
+
+    failures = [a for a in answers if isinstance(a, Exception) or "kural-highlight" not in a]
+    print(f"conversations: {args.conversations}  single: {single:.3f}s  batch wall: {wall:.3f}s  "
+          f"throughput: {args.conversations / wall:.1f} conv/s  llm calls: {llm.calls}")
+    for failure in failures[:5]:
+        print(f"  failed: {failure!r}"[:300])
+
+    if failures:
+        sys.exit(f"FAIL: {len(failures)} conversations did not complete")
+    if wall > single * args.max_slowdown:
+        sys.exit(f"FAIL: batch took {wall / single:.1f}x a single conversation; turns are being serialized")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Compares the Chroma and NumPy retrieval backends on load time, query latency
+and resident memory. Each backend runs in its own subprocess so peak RSS is not
+shared between them. Query vectors are taken from the index itself, so no
+embedding API calls are made.
+
+    python -m benchmarks.backends [--queries 200] [--batch 8] [--json out.json]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from vector_backends import NUMPY_INDEX_DIR, ChromaBackend, NumpyBackend, numpy_index_exists  # noqa: E402
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _percentile(samples, pct):
+    return float(np.percentile(samples, pct)) * 1000
+
+
+def run_backend(name: str, n_queries: int, batch: int, k: int) -> dict:
+    rss_before = _peak_rss_mb()
+    start = time.perf_counter()
+    if name == "numpy":
+        backend = NumpyBackend(embeddings=None)
+    else:
+        from langchain_community.vectorstores import Chroma
+        from ingest import DB_DIR
+        backend = ChromaBackend(Chroma(persist_directory=DB_DIR))
+    load_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    matrix = np.load(os.path.join(NUMPY_INDEX_DIR, "vectors.npy"), mmap_mode="r")
+    queries = np.asarray(matrix[rng.integers(0, matrix.shape[0], n_queries)])
+
+    single = []
+    for q in queries:
+        t = time.perf_counter()
+        backend.search_by_vectors([q], k=k)
+        single.append(time.perf_counter() - t)
+
+    batched = []
+    for i in range(0, n_queries, batch):
+        t = time.perf_counter()
+        backend.search_by_vectors(queries[i:i + batch], k=k)
+        batched.append(time.perf_counter() - t)
+
+    return {
+        "backend": name,
+        "load_ms": load_s * 1000,
+        "single_p50_ms": _percentile(single, 50),
+        "single_p95_ms": _percentile(single, 95),
+        "batch_size": batch,
+        "batch_p50_ms": _percentile(batched, 50),
+        "peak_rss_mb": _peak_rss_mb(),
+        "rss_growth_mb": _peak_rss_mb() - rss_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--run", choices=["chroma", "numpy"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_backend(args.run, args.queries, args.batch, args.k)))
+        return
+
+    if not numpy_index_exists():
+        sys.exit("No vector index found. Run `python ingest.py` first.")
+
+    results = []
+    for name in ("chroma", "numpy"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.backends", "--run", name,
+             "--queries", str(args.queries), "--batch", str(args.batch), "-k", str(args.k)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'backend':<8} {'load ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'batch p50':>10} {'peak RSS MB':>12}")
+    for r in results:
+        print(f"{r['backend']:<8} {r['load_ms']:>9.1f} {r['single_p50_ms']:>8.2f} {r['single_p95_ms']:>8.2f} "
+              f"{r['batch_p50_ms']:>10.2f} {r['peak_rss_mb']:>12.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
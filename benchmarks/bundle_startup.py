@@ -0,0 +1,112 @@
+"""Compares app startup from the kural bundle against the previous path (pandas
+CSV load plus a Chroma open): time to import and load everything a search needs,
+the first query, and peak RSS. Each path runs in its own fresh subprocess; query
+vectors come from the index, so no embedding API calls are made.
+
+    python ingest.py
+    python -m benchmarks.bundle_startup [--json out.json]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PATHS = ("csv+chroma", "bundle")
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_path(name: str) -> dict:
+    start = time.perf_counter()
+    if name == "bundle":
+        from bundle import open_bundle
+        from kural_store import KuralStore
+        from lexical_index import BM25Index
+        from vector_backends import NumpyBackend
+        imported = time.perf_counter()
+
+        bundle = open_bundle()
+        store = KuralStore.from_bundle(bundle)
+        lexical = BM25Index.loads(bundle.aux("lexical_index"))
+        backend = NumpyBackend.from_bundle(None, bundle)
+        query = bundle.array("vectors")[0]
+    else:
+        import numpy as np
+        from langchain_community.vectorstores import Chroma
+        from ingest import DB_DIR
+        from kural_store import KuralStore
+        from lexical_index import BM25Index
+        from vector_backends import NUMPY_INDEX_DIR, ChromaBackend
+        imported = time.perf_counter()
+
+        store = KuralStore.from_csv()
+        lexical = BM25Index.load()
+        backend = ChromaBackend(Chroma(persist_directory=DB_DIR))
+        query = np.load(os.path.join(NUMPY_INDEX_DIR, "vectors.npy"), mmap_mode="r")[0]
+    loaded = time.perf_counter()
+
+    hits = backend.search_by_vectors([query], k=5)[0]
+    lexical.search("கல்வி", k=5)
+    queried = time.perf_counter()
+
+    return {
+        "path": name,
+        "kurals": len(store),
+        "top_hit": hits[0][0]["id"] if hits else None,
+        "import_ms": (imported - start) * 1000,
+        "load_ms": (loaded - imported) * 1000,
+        "first_query_ms": (queried - loaded) * 1000,
+        "total_ms": (queried - start) * 1000,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per path; the median is reported")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--run", choices=PATHS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_path(args.run)))
+        return
+
+    from bundle import open_bundle
+    if open_bundle() is None:
+        sys.exit("No current kural bundle found. Run `python ingest.py` first.")
+
+    results = []
+    for name in PATHS:
+        runs = []
+        for _ in range(args.repeat):
+            out = subprocess.run([sys.executable, "-m", "benchmarks.bundle_startup", "--run", name],
+                                 cwd=ROOT, capture_output=True, text=True, check=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        runs.sort(key=lambda r: r["total_ms"])
+        results.append(runs[len(runs) // 2])
+
+    print(f"{'path':<11} {'import ms':>10} {'load ms':>9} {'1st query ms':>13} {'total ms':>9} {'peak RSS MB':>12}")
+    for r in results:
+        print(f"{r['path']:<11} {r['import_ms']:>10.1f} {r['load_ms']:>9.1f} {r['first_query_ms']:>13.2f} "
+              f"{r['total_ms']:>9.1f} {r['peak_rss_mb']:>12.1f}")
+    if results[0]["top_hit"] != results[1]["top_hit"]:
+        print("WARNING: the two paths disagree on the top hit; the bundle may be stale.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
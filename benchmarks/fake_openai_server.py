@@ -0,0 +1,175 @@
+"""Local stand-in for the OpenAI HTTP API that enforces its own rate limits, for
+exercising the request scheduler in rate_limiter.py end to end.
+
+Serves POST /v1/embeddings and /v1/chat/completions (including streamed replies)
+with deterministic content. Each endpoint admits at most `rps` requests in any
+one-second window; anything over gets a 429 carrying retry-after and retry-after-ms,
+like the real API. A fraction of requests can also fail with a 503.
+
+    python -m benchmarks.fake_openai_server [--port 8765] [--rps 5]
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 streamlit run app.py
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DIM = 256
+
+
+def _vector(item) -> list:
+    digest = hashlib.sha256(json.dumps(item).encode("utf-8")).digest()
+    rng = random.Random(digest)
+    vec = [rng.uniform(-1, 1) for _ in range(DIM)]
+    norm = sum(v * v for v in vec) ** 0.5
+    return [v / norm for v in vec]
+
+
+class FakeOpenAIServer:
+    def __init__(self, port: int = 0, rps: float = 5.0, error_rate: float = 0.0, latency: float = 0.05):
+        self.rps = rps
+        self.error_rate = error_rate
+        self.latency = latency
+        self.counts = {"ok": 0, "rate_limited": 0, "errors": 0}
+        self._admitted = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/v1"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def admit(self, endpoint: str):
+        """None if the request is within the endpoint's limit, else seconds until it would be."""
+        now = time.monotonic()
+        with self._lock:
+            window = self._admitted.setdefault(endpoint, deque())
+            while window and now - window[0] >= 1.0:
+                window.popleft()
+            if len(window) >= self.rps:
+                self.counts["rate_limited"] += 1
+                return 1.0 - (now - window[0])
+            window.append(now)
+            return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _json(self, status, body, headers=()):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                endpoint = self.path.rstrip("/").rsplit("/", 1)[-1]
+                if endpoint not in ("embeddings", "completions"):
+                    return self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                wait = server.admit(endpoint)
+                if wait is not None:
+                    return self._json(429, {"error": {"message": "Rate limit reached (fake server)",
+                                                      "type": "requests", "code": "rate_limit_exceeded"}},
+                                      [("retry-after", str(max(1, round(wait)))),
+                                       ("retry-after-ms", str(int(wait * 1000)))])
+                if random.random() < server.error_rate:
+                    with server._lock:
+                        server.counts["errors"] += 1
+                    return self._json(503, {"error": {"message": "Service unavailable (fake server)"}})
+                time.sleep(server.latency)
+                with server._lock:
+                    server.counts["ok"] += 1
+                if endpoint == "embeddings":
+                    self._embeddings(payload)
+                else:
+                    self._chat(payload)
+
+            def _embeddings(self, payload):
+                inputs = payload.get("input")
+                inputs = inputs if isinstance(inputs, list) and inputs and not isinstance(inputs[0], int) else [inputs]
+                data = []
+                for i, item in enumerate(inputs):
+                    vec = _vector(item)
+                    if payload.get("encoding_format") == "base64":
+                        vec = base64.b64encode(struct.pack(f"<{DIM}f", *vec)).decode("ascii")
+                    data.append({"object": "embedding", "index": i, "embedding": vec})
+                tokens = sum(len(json.dumps(item)) // 4 for item in inputs)
+                self._json(200, {"object": "list", "data": data, "model": payload.get("model"),
+                                 "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+            def _chat(self, payload):
+                text = ('<div class="kural-highlight">அகர முதல எழுத்தெல்லாம் ஆதி<br />பகவன் முதற்றே உலகு</div>\n\n'
+                        "As A is the first of letters, so God is the first of the world.")
+                prompt = sum(len(str(m.get("content", ""))) // 4 for m in payload.get("messages", []))
+                usage = {"prompt_tokens": prompt, "completion_tokens": len(text) // 4,
+                         "total_tokens": prompt + len(text) // 4}
+                base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": payload.get("model")}
+                if not payload.get("stream"):
+                    return self._json(200, {**base, "object": "chat.completion", "usage": usage, "choices": [{
+                        "index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}]})
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                chunks = [{"role": "assistant", "content": ""}] + [{"content": text[i:i + 16]}
+                                                                   for i in range(0, len(text), 16)]
+                events = [{**base, "object": "chat.completion.chunk",
+                           "choices": [{"index": 0, "delta": d, "finish_reason": None}]} for d in chunks]
+                events.append({**base, "object": "chat.completion.chunk",
+                               "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                if (payload.get("stream_options") or {}).get("include_usage"):
+                    events.append({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+                for event in events:
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rps", type=float, default=5.0, help="Requests per second admitted per endpoint")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.port, args.rps, args.error_rate, args.latency).start()
+    print(f"Fake OpenAI API on {server.base_url} ({args.rps:g} requests/s per endpoint). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(5)
+            print(server.counts)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Deterministic local stand-ins for OpenAIEmbeddings and ChatOpenAI.
+
+Both inject a configurable latency (seconds) so timings resemble network calls
+without spending credits. `install_fakes()` swaps them into clients.py, which
+every module uses to obtain its LLM and embeddings.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import re
+import time
+from typing import Any, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from lexical_index import tokenize
+from router import user_text
+
+FAKE_DIM = 256
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashes lexical tokens and character trigrams into a fixed-size unit vector,
+    so texts that share words land close together."""
+
+    def __init__(self, latency: float = 0.0, dim: int = FAKE_DIM):
+        self.latency = latency
+        self.dim = dim
+        self.requests = 0
+
+    @property
+    def identity(self) -> str:
+        return f"fake:hashing-{self.dim}"
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        features = tokenize(text)
+        compact = re.sub(r"\s+", " ", str(text).casefold())
+        features += [compact[i:i + 3] for i in range(len(compact) - 2)]
+        for feat in features:
+            h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        time.sleep(self.latency)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return [self._embed(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeChatModel(BaseChatModel):
+    """Scripted ReAct behaviour: on a fresh user turn it calls search_kurals with
+    the user's text; once a tool result is present it writes an answer quoting
+    the first kural from it, wrapped the way app.py asks for."""
+
+    latency: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-thirukural-chat"
+
+    def bind_tools(self, tools, tool_choice: Optional[str] = None, **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice=tool_choice, **kwargs)
+
+    def _reply(self, messages, tools=None, tool_choice=None, **_) -> AIMessage:
+        last = messages[-1]
+        prompt_tokens = sum(_approx_tokens(str(m.content)) for m in messages)
+        if tools and tool_choice != "none" and isinstance(last, HumanMessage):
+            message = AIMessage(content="", tool_calls=[{
+                "name": "search_kurals",
+                "args": {"query": user_text(last.content)},
+                "id": f"call_{self.calls}",
+            }])
+        else:
+            tool_output = next((m.content for m in reversed(messages) if isinstance(m, ToolMessage)), "")
+            tamil = next((line.split(":", 1)[1].strip() for line in tool_output.splitlines()
+                          if line.startswith(("Tamil:", "Tamil Kural:"))), "")
+            content = (f'<div class="kural-highlight">{tamil}</div>\n\n'
+                       "This kural speaks directly to your question.\n\n"
+                       "**Shall we discuss this next?**\n1. Friendship\n2. Wealth\n3. Virtue")
+            message = AIMessage(content=content)
+        completion_tokens = _approx_tokens(str(message.content)) + 10 * len(message.tool_calls)
+        message.usage_metadata = {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                                  "total_tokens": prompt_tokens + completion_tokens}
+        return message
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, **kwargs))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, **kwargs))])
+
+    def _chunks(self, message: AIMessage):
+        # Streamed like the OpenAI API: tool calls in one piece, text a few characters at a time
+        if message.tool_calls:
+            yield AIMessageChunk(content="", usage_metadata=message.usage_metadata, tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)])
+            return
+        text = message.content
+        for i in range(0, len(text), 24):
+            last = i + 24 >= len(text)
+            yield AIMessageChunk(content=text[i:i + 24], usage_metadata=message.usage_metadata if last else None)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        for chunk in self._chunks(self._reply(messages, **kwargs)):
+            if run_manager and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(self._reply(messages, **kwargs)):
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+
+def install_fakes(llm_latency: float = 0.0, embedding_latency: float = 0.0):
+    """Makes clients.get_llm()/get_embeddings() return the fakes. Call before the
+    agent or tools are first used. Returns (llm, embeddings)."""
+    import clients
+
+    llm = FakeChatModel(latency=llm_latency)
+    embeddings = FakeEmbeddings(latency=embedding_latency)
+    clients._llm = llm
+    clients._embeddings = embeddings
+    return llm, embeddings
@@ -0,0 +1,282 @@
+"""Headless load test for app.py: many concurrent chat sessions driven through the
+app script with Streamlit's testing API (AppTest), against latency-injecting fake
+LLM and embeddings. All sessions share one process, as they would share one
+Streamlit server, so cached resources (agent, indexes, client pool) are shared too.
+
+Ramp mode (default) reports, per concurrency level, p50/p95/p99 turn latency,
+throughput, per-session memory and peak thread count:
+
+    python -m benchmarks.load_test [--levels 1 2 4 8 16 32] [--turns 3] [--llm-latency 0.3]
+
+Cold-start mode starts every session against an empty INDEX_ROOT, so their first
+turns race through get_vectorstore -> build_index -> ingest_data. It fails unless
+exactly one build ran and every turn succeeded; with --processes the race also
+spans processes sharing the index directory:
+
+    python -m benchmarks.load_test --cold-start [--sessions 16] [--processes 4]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUESTIONS = [
+    "What does Kural say about learning?",
+    "How to manage money wisely?",
+    "What is the sign of true love?",
+    "How to choose good friends?",
+    "உழவு பற்றி என்ன சொல்கிறது?",
+    "explain kural 391",
+]
+
+
+def _proc_status(field: str):
+    """A numeric field of /proc/self/status (Linux), or None elsewhere."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def current_rss_mb() -> float:
+    rss_kb = _proc_status("VmRSS")
+    if rss_kb is not None:
+        return rss_kb / 1024
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def current_threads() -> int:
+    return _proc_status("Threads") or threading.active_count()
+
+
+class ResourceMonitor(threading.Thread):
+    """Samples RSS and thread count while a load level runs."""
+
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_rss_mb = current_rss_mb()
+        self.peak_threads = current_threads()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak_rss_mb = max(self.peak_rss_mb, current_rss_mb())
+            self.peak_threads = max(self.peak_threads, current_threads())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000
+
+
+def run_session(index: int, turns: int, timeout: float, questions=QUESTIONS):
+    """One browser tab: load the app, then ask `turns` questions. Returns (latencies, failures)."""
+    from streamlit.testing.v1 import AppTest
+
+    # Secrets come from install_secrets(); see there
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=timeout)
+    at.run()
+    latencies, failures = [], []
+    for turn in range(turns):
+        question = questions[(index + turn) % len(questions)]
+        start = time.perf_counter()
+        try:
+            at.chat_input[0].set_value(question).run()
+        except Exception as e:  # a timed-out or crashed script run
+            failures.append(f"session {index} turn {turn}: {e}")
+            continue
+        latencies.append(time.perf_counter() - start)
+        messages = at.session_state["messages"] if "messages" in at.session_state else []
+        if at.exception or at.error or not messages or messages[-1]["role"] != "assistant" \
+                or "kural-highlight" not in messages[-1]["content"]:
+            detail = at.exception[0].value if at.exception else (at.error[0].value if at.error else "no answer")
+            failures.append(f"session {index} turn {turn}: {detail}")
+    return latencies, failures
+
+
+def install_secrets():
+    """Gives every session the API key through one process-wide st.secrets. AppTest.secrets
+    would swap the global st.secrets in and out around each run, which races when
+    sessions run on threads."""
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+
+    secrets = Secrets()
+    secrets._secrets = {"OPENAI_API_KEY": os.environ["OPENAI_API_KEY"]}
+    st.secrets = secrets
+
+
+def serialize_script_compiles():
+    """A Streamlit server compiles app.py once, but every AppTest compiles its own copy,
+    and concurrent compiles can fail on CPython 3.11 ("AST constructor recursion depth
+    mismatch"). Sessions take turns compiling; runs of the compiled script still overlap."""
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    lock = threading.Lock()
+    get_bytecode = ScriptCache.get_bytecode
+
+    def locked_get_bytecode(self, script_path):
+        with lock:
+            return get_bytecode(self, script_path)
+    ScriptCache.get_bytecode = locked_get_bytecode
+
+
+def run_level(sessions: int, turns: int, timeout: float, questions=QUESTIONS) -> dict:
+    rss_before = current_rss_mb()
+    monitor = ResourceMonitor()
+    monitor.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(lambda i: run_session(i, turns, timeout, questions), range(sessions)))
+    wall = time.perf_counter() - start
+    monitor.stop()
+
+    latencies = [t for lat, _ in results for t in lat]
+    failures = [f for _, fail in results for f in fail]
+    return {
+        "sessions": sessions,
+        "turns": len(latencies),
+        "failures": len(failures),
+        "failure_examples": failures[:3],
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "p99_ms": _percentile(latencies, 99),
+        "throughput_turns_s": len(latencies) / wall if wall else 0.0,
+        "peak_rss_mb": monitor.peak_rss_mb,
+        "per_session_mb": max(0.0, monitor.peak_rss_mb - rss_before) / sessions,
+        "peak_threads": monitor.peak_threads,
+    }
+
+
+def ramp(args):
+    import ingest
+    # Build the index up front so the ramp measures serving, not ingestion
+    ingest.build_index()
+    run_session(0, 1, args.timeout)  # warm the shared caches
+
+    results = []
+    print(f"{'sessions':>8} {'turns':>6} {'fail':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'turns/s':>8} {'RSS MB':>8} {'MB/sess':>8} {'threads':>8}")
+    for level in args.levels:
+        r = run_level(level, args.turns, args.timeout)
+        results.append(r)
+        print(f"{r['sessions']:>8} {r['turns']:>6} {r['failures']:>5} {r['p50_ms']:>9.0f} {r['p95_ms']:>9.0f} "
+              f"{r['p99_ms']:>9.0f} {r['throughput_turns_s']:>8.2f} {r['peak_rss_mb']:>8.0f} "
+              f"{r['per_session_mb']:>8.2f} {r['peak_threads']:>8}")
+        for failure in r["failure_examples"]:
+            print(f"  failed: {failure}"[:300])
+
+    within = [r["sessions"] for r in results if r["p95_ms"] <= args.max_p95_ms and not r["failures"]]
+    if within:
+        print(f"\nHighest concurrency with p95 <= {args.max_p95_ms:.0f} ms and no failures: {max(within)} sessions")
+    else:
+        print(f"\nNo level kept p95 <= {args.max_p95_ms:.0f} ms without failures")
+    return results
+
+
+def cold_start_child(args) -> dict:
+    """Runs concurrent first turns against an index that does not exist yet."""
+    import ingest
+    builds = []
+    original = ingest.ingest_data
+
+    def counted_ingest(*a, **kw):
+        builds.append(os.getpid())
+        return original(*a, **kw)
+    ingest.ingest_data = counted_ingest
+
+    # Topic questions only, so every first turn needs the vector index (kural IDs are routed without it)
+    topics = [q for q in QUESTIONS if not any(c.isdigit() for c in q)]
+    r = run_level(args.sessions, 1, args.timeout, topics) if args.sessions else {}
+    import clients
+    return {**r, "builds": len(builds), "embedding_requests": clients._embeddings.requests}
+
+
+def cold_start(args):
+    if args.processes <= 1:
+        results = [cold_start_child(args)]
+    else:
+        procs = [subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.load_test", "--cold-start", "--child",
+             "--sessions", str(args.sessions), "--timeout", str(args.timeout),
+             "--llm-latency", str(args.llm_latency), "--embedding-latency", str(args.embedding_latency)],
+            cwd=ROOT, stdout=subprocess.PIPE, text=True) for _ in range(args.processes)]
+        results = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+
+    builds = sum(r["builds"] for r in results)
+    failures = sum(r.get("failures", 0) for r in results)
+    for i, r in enumerate(results):
+        print(f"process {i}: sessions={r.get('sessions')} builds={r['builds']} failures={r.get('failures')} "
+              f"first-turn p50={r.get('p50_ms', float('nan')):.0f} ms p99={r.get('p99_ms', float('nan')):.0f} ms "
+              f"embedding requests={r['embedding_requests']} peak threads={r.get('peak_threads')}")
+        for failure in r.get("failure_examples", []):
+            print(f"  failed: {failure}"[:300])
+    print(f"\nIndex builds: {builds} across {len(results)} process(es)")
+    if builds != 1 or failures:
+        sys.exit(f"FAIL: expected exactly one index build and no failed turns (got {builds} builds, {failures} failures)")
+    print("OK")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session in ramp mode")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds allowed for one script run")
+    parser.add_argument("--max-p95-ms", type=float, default=5000.0, help="Latency budget for the capacity line")
+    parser.add_argument("--cold-start", action="store_true", help="Race first turns through the index build")
+    parser.add_argument("--sessions", type=int, default=16, help="Concurrent sessions per process in cold-start mode")
+    parser.add_argument("--processes", type=int, default=1, help="Processes sharing INDEX_ROOT in cold-start mode")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    # Indexes and caches built from fake vectors stay out of the real ones; children inherit the parent's
+    os.environ.setdefault("INDEX_ROOT", tempfile.mkdtemp(prefix="thirukural-load-"))
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-load-test")
+    os.environ.setdefault("ANSWER_CACHE", "0")
+    os.environ.setdefault("TRACING", "0")
+    if args.cold_start:
+        # The Chroma backend takes the get_vectorstore -> ingest_data path
+        os.environ.setdefault("VECTOR_BACKEND", "chroma")
+
+    from benchmarks.fakes import install_fakes
+    install_fakes(args.llm_latency, args.embedding_latency)
+    install_secrets()
+    serialize_script_compiles()
+
+    if args.child:
+        print(json.dumps(cold_start_child(args)))
+        return
+    results = cold_start(args) if args.cold_start else ramp(args)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Compares quantized first-pass search with exact re-ranking against a float32
+brute-force baseline over the couplet and commentary chunks: first-pass memory,
+query latency, and recall@k of the unique kural IDs returned. Queries are chunk
+vectors from the index with Gaussian noise added, so no embedding API calls are made.
+
+    INDEX_COMMENTARIES=1 python ingest.py
+
+ingest.py always runs a build, so it also adds the commentaries to an existing index
+(for example one built under the default numpy backend). An app session with
+VECTOR_BACKEND=quantized rebuilds on its own when the chunk index lacks them.
+    python -m benchmarks.quantization [--queries 200] [--noise 0.5] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from vector_backends import CHUNK_INDEX_DIR, QuantizedBackend, chunk_index_exists  # noqa: E402
+
+RERANK_FACTORS = (5, 20, 50)
+
+
+def _percentile(samples, pct):
+    return float(np.percentile(samples, pct)) * 1000
+
+
+def exact_top_k(matrix, chunk_ids, query, k):
+    """The float32 baseline: score every chunk, keep each kural's best chunk."""
+    scores = matrix @ query
+    order = np.argsort(-scores)
+    top = []
+    for i in order:
+        kid = int(chunk_ids[i])
+        if kid not in top:
+            top.append(kid)
+            if len(top) == k:
+                break
+    return top
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.5, help="Noise norm relative to the unit query vector")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    if not chunk_index_exists(commentaries=True):
+        sys.exit("No chunk index with commentaries found. Run `INDEX_COMMENTARIES=1 python ingest.py` first.")
+
+    matrix = np.load(os.path.join(CHUNK_INDEX_DIR, "vectors.npy"))
+    with open(os.path.join(CHUNK_INDEX_DIR, "chunks.json"), encoding="utf-8") as f:
+        chunks = json.load(f)
+    chunk_ids = np.array([c["id"] for c in chunks])
+    sources = sorted({c["source"] for c in chunks})
+    print(f"{len(chunks)} chunks over {len(set(chunk_ids.tolist()))} kurals, {matrix.shape[1]} dims "
+          f"(sources: {', '.join(sources)})")
+
+    rng = np.random.default_rng(0)
+    picked = matrix[rng.integers(0, len(matrix), args.queries)]
+    noise = rng.normal(size=picked.shape).astype(np.float32)
+    noise *= args.noise / np.linalg.norm(noise, axis=1, keepdims=True)
+    queries = picked + noise
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    results = []
+    latencies, truth = [], []
+    for q in queries:
+        t = time.perf_counter()
+        truth.append(exact_top_k(matrix, chunk_ids, q, args.k))
+        latencies.append(time.perf_counter() - t)
+    results.append({"method": "float32 exact", "memory_mb": matrix.nbytes / 2**20,
+                    "p50_ms": _percentile(latencies, 50), "p95_ms": _percentile(latencies, 95), "recall": 1.0})
+
+    for quantization in ("int8", "binary"):
+        for factor in RERANK_FACTORS:
+            backend = QuantizedBackend(embeddings=None, quantization=quantization, rerank_factor=factor)
+            latencies, recalls = [], []
+            for q, expected in zip(queries, truth):
+                t = time.perf_counter()
+                hits = backend.search_by_vectors([q], k=args.k)[0]
+                latencies.append(time.perf_counter() - t)
+                recalls.append(len({m["id"] for m, _ in hits} & set(expected)) / len(expected))
+            results.append({"method": f"{quantization} + rerank x{factor}",
+                            "memory_mb": backend.memory_bytes() / 2**20,
+                            "p50_ms": _percentile(latencies, 50), "p95_ms": _percentile(latencies, 95),
+                            "recall": float(np.mean(recalls))})
+
+    print(f"{'method':<22} {'memory MB':>10} {'p50 ms':>8} {'p95 ms':>8} {f'recall@{args.k}':>10}")
+    for r in results:
+        print(f"{r['method']:<22} {r['memory_mb']:>10.2f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['recall']:>10.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Drives interactive chat turns and a background ingestion burst at the fake
+rate-limited OpenAI server (benchmarks/fake_openai_server.py), once with plain
+HTTP clients and once through the request scheduler in rate_limiter.py.
+
+Each interactive turn embeds a query and then calls chat completions; the
+ingestion workers embed document batches back to back, so both compete for the
+embeddings limit. Reports failed calls, 429s and per-priority latency, and fails
+(exit 1) if any scheduled call failed or interactive requests waited longer than
+ingestion at p95.
+
+    python -m benchmarks.rate_limits [--rps 5] [--users 4] [--turns 5] [--ingest-workers 4]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from rate_limiter import BACKGROUND, RequestScheduler, ScheduledTransport, request_priority
+
+
+def _p95(samples):
+    if not samples:
+        return float("nan")
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000
+
+
+def run(server, scheduled: bool, args) -> dict:
+    scheduler = RequestScheduler({"llm": (args.rps * 60, 0), "embeddings": (args.rps * 60, 0)},
+                                 backoff=0.2, max_retries=8)
+    transport = ScheduledTransport(httpx.HTTPTransport(), scheduler) if scheduled else httpx.HTTPTransport()
+    client = httpx.Client(base_url=server.base_url, transport=transport, timeout=60)
+    latencies = {"interactive": [], "background": [], "chat": []}
+    failures = []
+    lock = threading.Lock()
+
+    def post(path, body, bucket):
+        start = time.perf_counter()
+        response = client.post(path, json=body)
+        with lock:
+            if response.status_code != 200:
+                failures.append(f"{path}: {response.status_code}")
+            else:
+                latencies[bucket].append(time.perf_counter() - start)
+
+    def user(i):
+        for turn in range(args.turns):
+            post("/embeddings", {"model": "text-embedding-3-small", "input": [f"user {i} question {turn}"]},
+                 "interactive")
+            post("/chat/completions", {"model": "gpt-4o-mini",
+                                       "messages": [{"role": "user", "content": f"question {turn}"}]}, "chat")
+            time.sleep(args.think_time)
+
+    def ingest(i):
+        with request_priority(BACKGROUND):
+            for batch in range(args.ingest_batches):
+                post("/embeddings", {"model": "text-embedding-3-small",
+                                     "input": [f"kural {i}-{batch}-{n}" for n in range(100)]}, "background")
+
+    before = dict(server.counts)
+    start = time.perf_counter()
+    threads = [threading.Thread(target=ingest, args=(i,)) for i in range(args.ingest_workers)]
+    threads += [threading.Thread(target=user, args=(i,)) for i in range(args.users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    client.close()
+
+    return {
+        "mode": "scheduled" if scheduled else "unscheduled",
+        "failed_calls": len(failures),
+        "server_429s": server.counts["rate_limited"] - before["rate_limited"],
+        "interactive_embed_p95_ms": _p95(latencies["interactive"]),
+        "background_embed_p95_ms": _p95(latencies["background"]),
+        "chat_p50_ms": statistics.median(latencies["chat"]) * 1000 if latencies["chat"] else float("nan"),
+        "chat_p95_ms": _p95(latencies["chat"]),
+        "wall_s": wall,
+        "scheduler": scheduler.stats() if scheduled else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rps", type=float, default=5.0, help="Server limit per endpoint, requests per second")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--think-time", type=float, default=0.2)
+    parser.add_argument("--ingest-workers", type=int, default=4)
+    parser.add_argument("--ingest-batches", type=int, default=5)
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Fraction of server replies that are 503s")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(rps=args.rps, error_rate=args.error_rate).start()
+    results = [run(server, False, args), run(server, True, args)]
+    server.stop()
+
+    print(f"{'mode':<12} {'failed':>7} {'429s':>6} {'interactive p95':>16} {'ingest p95':>11} "
+          f"{'chat p50':>9} {'chat p95':>9} {'wall s':>7}")
+    for r in results:
+        print(f"{r['mode']:<12} {r['failed_calls']:>7} {r['server_429s']:>6} {r['interactive_embed_p95_ms']:>13.0f} ms "
+              f"{r['background_embed_p95_ms']:>8.0f} ms {r['chat_p50_ms']:>9.0f} {r['chat_p95_ms']:>9.0f} "
+              f"{r['wall_s']:>7.1f}")
+    print(f"\nScheduler: {results[1]['scheduler']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    scheduled = results[1]
+    if scheduled["failed_calls"]:
+        sys.exit(f"FAIL: {scheduled['failed_calls']} calls failed through the scheduler")
+    if scheduled["interactive_embed_p95_ms"] > scheduled["background_embed_p95_ms"]:
+        sys.exit("FAIL: interactive requests waited longer than ingestion")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Measures how long a Streamlit rerun of app.py takes as the conversation grows.
+Each size gets a session pre-filled with that many turns (question plus a full
+HTML answer); the app is then rerun without new input, which is what every widget
+interaction costs. Fails (exit 1) if the rerun at the largest size is more than
+--max-growth times slower than at one turn.
+
+    python -m benchmarks.rerun_cost [--turns 1 10 50 100 200] [--reruns 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ANSWER = (
+    '<div class="kural-highlight">கற்க கசடறக் கற்பவை கற்றபின்<br>நிற்க அதற்குத் தக</div>\n\n'
+    + "கற்க வேண்டியவற்றைக் குற்றமறக் கற்க வேண்டும்; கற்ற பிறகு அக்கல்விக்குத் தக்கபடி நடக்க வேண்டும். " * 4
+    + "\n\nLearn thoroughly what should be learnt, and then live by that learning. " * 6
+    + "\n\n**Shall we discuss this next?**\n1. Teachers\n2. Listening\n3. Ignorance"
+)
+
+
+def history(turns):
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"Question {i + 1}: what does Kural say about learning?"})
+        messages.append({"role": "assistant", "content": ANSWER})
+    return messages
+
+
+def measure(turns, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    at.secrets["OPENAI_API_KEY"] = os.environ["OPENAI_API_KEY"]
+    at.session_state["messages"] = history(turns)
+    at.run()  # first run fills the caches and loads the agent
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+    samples = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - start)
+    return {
+        "turns": turns,
+        "p50_ms": statistics.median(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+        "chat_messages": len(at.chat_message),
+        "markdown_elements": len(at.markdown),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--max-growth", type=float, default=2.0,
+                        help="Allowed ratio of the largest size's p50 rerun time to the smallest's")
+    args = parser.parse_args()
+
+    os.environ.setdefault("INDEX_ROOT", tempfile.mkdtemp(prefix="thirukural-bench-"))
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    os.environ.setdefault("TRACING", "0")
+
+    from benchmarks.fakes import install_fakes
+    install_fakes()
+
+    results = [measure(turns, args.reruns) for turns in args.turns]
+    print(f"{'turns':>6} {'p50 ms':>9} {'max ms':>9} {'chat msgs':>10} {'markdown':>9}")
+    for r in results:
+        print(f"{r['turns']:>6} {r['p50_ms']:>9.2f} {r['max_ms']:>9.2f} {r['chat_messages']:>10} "
+              f"{r['markdown_elements']:>9}")
+
+    growth = results[-1]["p50_ms"] / results[0]["p50_ms"]
+    print(f"\nRerun time at {results[-1]['turns']} turns is {growth:.2f}x that at {results[0]['turns']}.")
+    if growth > args.max_growth:
+        print(f"FAIL: more than {args.max_growth}x; reruns still grow with the conversation.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Offline end-to-end benchmark: ingestion, vectorstore load, each tool, the full
+agent loop, and retrieval recall@5 on held-out paraphrase queries, all against
+deterministic local fakes.
+
+    python -m benchmarks.run [--out results.json] [--compare previous.json]
+
+Results are written as JSON (with the git commit) so runs can be diffed across
+commits. Latencies injected into the fakes are configurable to mimic the API.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+AGENT_QUESTIONS = [
+    "What does Kural say about learning?",
+    "How to manage money wisely?",
+    "உழவு பற்றி என்ன சொல்கிறது?",
+    "explain kural 391",
+]
+
+
+def _timed(fn, repeat=1):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Held-out recall queries: this commentary paraphrases each kural, and is in neither the
+# BM25 fields nor the couplet embeddings (only the quantized backend's commentary chunks)
+RECALL_QUERY_SOURCE = "solomon_pappaiya"
+
+
+def recall_queries():
+    """(paraphrase, kural ID) pairs. Commentaries are not in the bundle, so read the CSV."""
+    from kural_store import KuralStore
+    return [(r["commentaries"][RECALL_QUERY_SOURCE], r["id"])
+            for r in KuralStore.from_csv().records if r["commentaries"].get(RECALL_QUERY_SOURCE)]
+
+
+def recall_at_5(tools, queries, mode):
+    """Share of paraphrase queries whose kural is among the top five results."""
+    previous = tools.SEARCH_MODE
+    tools.SEARCH_MODE = mode
+    try:
+        return statistics.fmean(kid in tools.rank_kurals(query, k=5) for query, kid in queries)
+    finally:
+        tools.SEARCH_MODE = previous
+
+
+def run(args):
+    os.environ.setdefault("INDEX_ROOT", tempfile.mkdtemp(prefix="thirukural-bench-"))
+    # Set before the app modules are imported, which read it once
+    os.environ["VECTOR_BACKEND"] = args.backend
+
+    from benchmarks.fakes import install_fakes
+    from langchain_core.messages import HumanMessage
+    import agent
+    import ingest
+    import tools
+    from kural_store import get_kural_store
+
+    llm, embeddings = install_fakes(args.llm_latency, args.embedding_latency)
+    results = {}
+
+    results["ingest_cold"] = _summary(_timed(ingest.ingest_data))
+    results["ingest_warm"] = _summary(_timed(ingest.ingest_data))
+
+    def cold_vectorstore():
+        tools._vectorstore = None
+        tools.get_vectorstore()
+    results["get_vectorstore_cold"] = _summary(_timed(cold_vectorstore))
+    results["get_vectorstore_warm"] = _summary(_timed(tools.get_vectorstore, repeat=args.repeat))
+
+    store = get_kural_store()
+    chapters = list(store.by_adhigaram)
+    queries = iter(chapters * (args.repeat // len(chapters) + 1))
+    results["tool_search_kurals"] = _summary(_timed(
+        lambda: tools.search_kurals.invoke({"query": next(queries)}), repeat=args.repeat))
+    results["tool_get_kural_explanation"] = _summary(_timed(
+        lambda: tools.get_kural_explanation.invoke({"kural_id": 391}), repeat=args.repeat))
+    results["tool_related_kurals"] = _summary(_timed(
+        lambda: tools.related_kurals.invoke({"kural_id": 391}), repeat=args.repeat))
+    results["tool_find_kural_by_verse"] = _summary(_timed(
+        lambda: tools.find_kural_by_verse.invoke({"verse_text": "karka kasadara karpavai"}), repeat=args.repeat))
+    results["tool_get_random_kural_by_category"] = _summary(_timed(
+        lambda: tools.get_random_kural_by_category.invoke({"category": "love"}), repeat=args.repeat))
+
+    graph = agent.get_thirukural_agent()
+    questions = iter(AGENT_QUESTIONS * args.repeat)
+    llm_calls_before = llm.calls
+    results["agent_invoke"] = _summary(_timed(
+        lambda: graph.invoke({"messages": [HumanMessage(content=next(questions))]}), repeat=args.repeat))
+    results["agent_invoke"]["llm_calls_per_turn"] = (llm.calls - llm_calls_before) / args.repeat
+
+    paraphrases = recall_queries()
+    results["recall_at_5"] = {mode: recall_at_5(tools, paraphrases, mode) for mode in ("lexical", "vector", "hybrid")}
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "backend": os.environ["VECTOR_BACKEND"],
+            "llm_latency_s": args.llm_latency,
+            "embedding_latency_s": args.embedding_latency,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(current, previous):
+    print(f"\nvs {previous.get('commit')} ({previous.get('timestamp')}):")
+    for name, now in current["results"].items():
+        before = previous.get("results", {}).get(name)
+        if not before:
+            continue
+        if "p50_ms" in now:
+            delta = (now["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+            print(f"  {name:<36} p50 {before['p50_ms']:9.2f} -> {now['p50_ms']:9.2f} ms ({delta:+.1f}%)")
+        else:
+            for mode, value in now.items():
+                print(f"  {name + '.' + mode:<36} {before.get(mode, float('nan')):.3f} -> {value:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Previous results file to diff against")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--backend", choices=["numpy", "chroma", "quantized"],
+                        default=os.getenv("VECTOR_BACKEND", "numpy").lower(),
+                        help="Retrieval backend (default: VECTOR_BACKEND, as the app uses)")
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--embedding-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    report = run(args)
+    for name, value in report["results"].items():
+        print(f"{name:<36} {json.dumps(value)}")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, "thirukural_data.csv")
+INDEX_ROOT = os.getenv("INDEX_ROOT", BASE_DIR)
+BUNDLE_PATH = os.path.join(INDEX_ROOT, "kural_bundle.bin")
+
+# Check every section's SHA-256 when opening (about 10 ms for the whole bundle)
+BUNDLE_VERIFY = os.getenv("BUNDLE_VERIFY", "1") == "1"
+
+# File layout: MAGIC, u32 version, u32 header length, JSON header, then sections
+# aligned to ALIGN bytes so arrays can be used straight from the memory map.
+MAGIC = b"KURALBND"
+BUNDLE_VERSION = 1
+ALIGN = 64
+_PREAMBLE = struct.Struct("<8sII")
+
+# Record fields stored column-wise: UTF-8 blobs with offsets, and int32 arrays
+TEXT_FIELDS = ("tamil_kural", "english_kural", "adhigaram", "paal", "iyal",
+               "meaning_tamil", "meaning_english", "transliteration")
+INT_FIELDS = ("id", "adhigaram_id")
+
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_bundle(records: List[Dict], vectors, aux: Dict[str, bytes], embedding_identity: str,
+                 path: str = BUNDLE_PATH, source_path: str = DATA_PATH):
+    """Writes the kural records, their embedding matrix (row i belongs to records[i],
+    L2-normalized) and auxiliary indexes (name -> serialized bytes) as one file."""
+    sections = []
+    for field in INT_FIELDS:
+        sections.append((field, np.asarray([r[field] for r in records], dtype=np.int32)))
+    for field in TEXT_FIELDS:
+        encoded = [str(r[field]).encode("utf-8") for r in records]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+        offsets[1:] = np.cumsum([len(e) for e in encoded])
+        sections.append((f"{field}.offsets", offsets))
+        sections.append((f"{field}.data", np.frombuffer(b"".join(encoded), dtype=np.uint8)))
+    sections.append(("vectors", np.ascontiguousarray(vectors, dtype=np.float32)))
+    for name, data in aux.items():
+        sections.append((f"aux.{name}", np.frombuffer(data, dtype=np.uint8)))
+
+    table, offset = {}, 0
+    for name, array in sections:
+        table[name] = {"offset": offset, "nbytes": array.nbytes, "dtype": array.dtype.str,
+                       "shape": list(array.shape), "sha256": hashlib.sha256(array.tobytes()).hexdigest()}
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({
+        "version": BUNDLE_VERSION,
+        "count": len(records),
+        "embedding_identity": embedding_identity,
+        "source_sha256": file_sha256(source_path),
+        "sections": table,
+    }).encode("utf-8")
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, BUNDLE_VERSION, len(header)))
+        f.write(header)
+        for name, array in sections:
+            f.seek(data_start + table[name]["offset"])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+class KuralBundle:
+    """Read-only view of a bundle through a memory map. Arrays are zero-copy views,
+    so opening parses only the JSON header and worker processes share the pages."""
+
+    def __init__(self, path: str = BUNDLE_PATH, verify: bool = BUNDLE_VERIFY):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_len = _PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a kural bundle")
+        if version != BUNDLE_VERSION:
+            raise ValueError(f"{path} has bundle version {version}, expected {BUNDLE_VERSION}")
+        self.header = json.loads(self._mm[_PREAMBLE.size:_PREAMBLE.size + header_len])
+        self._data_start = _align(_PREAMBLE.size + header_len)
+        if verify:
+            self.verify()
+
+    @property
+    def embedding_identity(self) -> str:
+        return self.header["embedding_identity"]
+
+    def _view(self, name: str) -> memoryview:
+        s = self.header["sections"][name]
+        start = self._data_start + s["offset"]
+        return memoryview(self._mm)[start:start + s["nbytes"]]
+
+    def verify(self):
+        for name, s in self.header["sections"].items():
+            if hashlib.sha256(self._view(name)).hexdigest() != s["sha256"]:
+                raise ValueError(f"{self.path}: checksum mismatch in section {name!r}")
+
+    def array(self, name: str) -> np.ndarray:
+        s = self.header["sections"][name]
+        return np.frombuffer(self._view(name), dtype=np.dtype(s["dtype"])).reshape(s["shape"])
+
+    def aux(self, name: str) -> Optional[bytes]:
+        key = f"aux.{name}"
+        return bytes(self._view(key)) if key in self.header["sections"] else None
+
+    def column(self, field: str) -> List:
+        if field in INT_FIELDS:
+            return self.array(field).tolist()
+        offsets = self.array(f"{field}.offsets").tolist()
+        data = self._view(f"{field}.data")
+        return [str(data[offsets[i]:offsets[i + 1]], "utf-8") for i in range(len(offsets) - 1)]
+
+    def records(self, fields: Sequence[str] = INT_FIELDS + TEXT_FIELDS) -> List[Dict]:
+        columns = {field: self.column(field) for field in fields}
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+# Validated bundles by file version, so the checksums run once per process and every caller shares one map
+_opened: Dict[tuple, KuralBundle] = {}
+_opened_lock = threading.Lock()
+
+
+def open_bundle(path: str = BUNDLE_PATH, source_path: str = DATA_PATH) -> Optional[KuralBundle]:
+    """The bundle at `path`, or None when it is missing, from another format version,
+    corrupt, or built from a different CSV than the one on disk."""
+    if not os.path.exists(path):
+        return None
+    source_mtime = os.stat(source_path).st_mtime_ns if os.path.exists(source_path) else None
+    key = (path, os.stat(path).st_mtime_ns, source_mtime)
+    with _opened_lock:
+        if key in _opened:
+            return _opened[key]
+        try:
+            bundle = KuralBundle(path)
+        except (ValueError, OSError, struct.error) as e:
+            print(f"Ignoring kural bundle: {e}")
+            return None
+        if source_mtime is not None and bundle.header["source_sha256"] != file_sha256(source_path):
+            print("Ignoring kural bundle: built from a different thirukural_data.csv")
+            return None
+        _opened[key] = bundle
+        return bundle
@@ -0,0 +1,89 @@
+import os
+import threading
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from rate_limiter import AsyncScheduledTransport, ScheduledTransport
+
+LLM_MODEL = "gpt-4o-mini"
+EMBEDDING_MODEL = "text-embedding-3-small"
+# "openai" (EMBEDDING_MODEL over the API) or "local" (offline hashing embedder on the CPU)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai").lower()
+
+# Connection pool shared by every OpenAI request in the process
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+
+# OpenAI requests are retried by the shared scheduler in rate_limiter.py, not the SDK
+SDK_MAX_RETRIES = 0
+
+# Process-wide clients, created once on first use
+_http_client = None
+_async_http_client = None
+_llm = None
+_embeddings = None
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS)
+
+
+def get_http_clients():
+    """Pooled HTTP clients whose requests all pass through the rate-limit scheduler."""
+    global _http_client, _async_http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _async_http_client = httpx.AsyncClient(
+                    transport=AsyncScheduledTransport(httpx.AsyncHTTPTransport(limits=_limits())),
+                    timeout=HTTP_TIMEOUT)
+                _http_client = httpx.Client(transport=ScheduledTransport(httpx.HTTPTransport(limits=_limits())),
+                                            timeout=HTTP_TIMEOUT)
+    return _http_client, _async_http_client
+
+
+def get_llm() -> ChatOpenAI:
+    global _llm
+    if _llm is None:
+        http_client, async_http_client = get_http_clients()
+        with _lock:
+            if _llm is None:
+                # stream_usage reports token counts on streamed replies too
+                _llm = ChatOpenAI(model=LLM_MODEL, temperature=0, stream_usage=True, max_retries=SDK_MAX_RETRIES,
+                                  http_client=http_client, http_async_client=async_http_client)
+    return _llm
+
+
+def get_embeddings():
+    """The embeddings for both ingest and queries, from the configured EMBEDDING_PROVIDER."""
+    global _embeddings
+    if _embeddings is None:
+        if EMBEDDING_PROVIDER == "local":
+            from local_embeddings import HashingEmbeddings
+            with _lock:
+                if _embeddings is None:
+                    _embeddings = HashingEmbeddings()
+            return _embeddings
+        if EMBEDDING_PROVIDER != "openai":
+            raise ValueError(f"Unknown EMBEDDING_PROVIDER {EMBEDDING_PROVIDER!r}; use 'openai' or 'local'.")
+        http_client, async_http_client = get_http_clients()
+        with _lock:
+            if _embeddings is None:
+                _embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL, max_retries=SDK_MAX_RETRIES,
+                                               http_client=http_client, http_async_client=async_http_client)
+    return _embeddings
+
+
+def embedding_identity(embeddings=None) -> str:
+    """Names the provider and model behind `embeddings` (default: the configured ones).
+    Indexes record it so vectors from different models are never compared."""
+    embeddings = embeddings if embeddings is not None else get_embeddings()
+    identity = getattr(embeddings, "identity", None)
+    if identity:
+        return identity
+    return f"openai:{getattr(embeddings, 'model', EMBEDDING_MODEL)}"
@@ -0,0 +1,164 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+from tracing import span
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Generated indexes and caches live under INDEX_ROOT (defaults to the app directory)
+INDEX_ROOT = os.getenv("INDEX_ROOT", BASE_DIR)
+CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE", os.path.join(INDEX_ROOT, "cache", "query_embeddings.sqlite3"))
+
+# Bounds for the two cache tiers
+MEMORY_ENTRIES = int(os.getenv("QUERY_EMBEDDING_MEMORY_ENTRIES", "512"))
+DISK_ENTRIES = int(os.getenv("QUERY_EMBEDDING_DISK_ENTRIES", "20000"))
+
+
+def normalize_query(text: str) -> str:
+    """NFC-normalizes, casefolds and collapses whitespace so trivially different
+    spellings of the same query share one cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split())
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Wraps an Embeddings object with an in-memory LRU in front of an on-disk
+    SQLite cache for query embeddings. Document embeddings pass straight through."""
+
+    def __init__(self, inner: Embeddings, model_name: str, path: str = CACHE_PATH,
+                 memory_entries: int = MEMORY_ENTRIES, disk_entries: int = DISK_ENTRIES):
+        self.inner = inner
+        self.model_name = model_name
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT, vector BLOB, last_used REAL)"
+        )
+        self._db.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            row = self._db.execute("SELECT vector FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                vector = array("f", row[0]).tolist()
+                self._db.execute("UPDATE query_embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return vector
+        return None
+
+    def _store(self, key: str, vector: List[float]):
+        with self._lock:
+            self.misses += 1
+            self._remember(key, vector)
+            self._db.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                (key, self.model_name, array("f", vector).tobytes(), time.time()),
+            )
+            self._evict()
+            self._db.commit()
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        with span("embed_query", "embedding", model=self.model_name) as s:
+            vector = self._lookup(key)
+            s["cache_hit"] = vector is not None
+            if vector is None:
+                # Network call happens outside the lock so concurrent misses don't serialize
+                vector = self.inner.embed_query(text)
+                self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        with span("embed_query", "embedding", model=self.model_name) as s:
+            vector = self._lookup(key)
+            s["cache_hit"] = vector is not None
+            if vector is None:
+                vector = await self.inner.aembed_query(text)
+                self._store(key, vector)
+        return vector
+
+    def _batch(self, texts: List[str]):
+        """Cache lookups for several queries. Returns (keys, vectors with None for misses,
+        {key: text} of distinct misses)."""
+        keys = [self._key(t) for t in texts]
+        vectors = [self._lookup(k) for k in keys]
+        missing = {k: t for k, t, v in zip(keys, texts, vectors) if v is None}
+        return keys, vectors, missing
+
+    def _fill(self, keys, vectors, missing, fresh):
+        by_key = dict(zip(missing, fresh))
+        for key, vector in by_key.items():
+            self._store(key, vector)
+        return [v if v is not None else by_key[k] for k, v in zip(keys, vectors)]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embeds several queries, sending all cache misses in a single request."""
+        with span("embed_queries", "embedding", model=self.model_name, queries=len(texts)) as s:
+            keys, vectors, missing = self._batch(texts)
+            s["cache_hit"] = not missing
+            fresh = self.inner.embed_documents(list(missing.values())) if missing else []
+            return self._fill(keys, vectors, missing, fresh)
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        with span("embed_queries", "embedding", model=self.model_name, queries=len(texts)) as s:
+            keys, vectors, missing = self._batch(texts)
+            s["cache_hit"] = not missing
+            fresh = await self.inner.aembed_documents(list(missing.values())) if missing else []
+            return self._fill(keys, vectors, missing, fresh)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.inner.aembed_documents(texts)
+
+    def _evict(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()
+        if count > self.disk_entries:
+            self._db.execute(
+                "DELETE FROM query_embeddings WHERE key IN "
+                "(SELECT key FROM query_embeddings ORDER BY last_used ASC LIMIT ?)",
+                (count - self.disk_entries,),
+            )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
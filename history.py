@@ -0,0 +1,144 @@
+import os
+import re
+from typing import Dict, List, NamedTuple, Tuple
+
+# Token budget for the conversation history sent with each turn (the latest user turn is always kept)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+# What app.py used to send verbatim; the baseline for the tokens-saved report
+RAW_HISTORY_WINDOW = 10
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+# The follow-up suggestions closing every answer are for the reader, not for the model
+_FOLLOW_UP_RE = re.compile(r"\*\*(Shall we discuss this next\?|அடுத்து இதைப் பற்றி பேசலாமா\?)\*\*.*", re.S)
+_KURAL_ID_RE = re.compile(r"(?:kural|குறள்|ID)\s*(?:#|no\.?|number|எண்)?\s*:?\s*(\d{1,4})", re.I)
+
+# Characters per token assumed when the tokenizer is unavailable (conservative for Tamil)
+FALLBACK_CHARS_PER_TOKEN = 3
+
+_encoding = None
+
+
+def _load_encoding():
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model("gpt-4o-mini")
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = _load_encoding()
+        except Exception as e:
+            # tiktoken downloads its BPE file on first use, which fails offline; estimate instead
+            print(f"Token counts are estimated: could not load the tokenizer ({type(e).__name__}: {e})")
+            _encoding = False
+    if _encoding is False:
+        return len(text) // FALLBACK_CHARS_PER_TOKEN
+    return len(_encoding.encode(text))
+
+
+def strip_presentation(text: str, keep_follow_ups: bool = False) -> str:
+    """Drops HTML wrappers and (unless `keep_follow_ups`) the follow-up question block from a past answer."""
+    if not keep_follow_ups:
+        text = _FOLLOW_UP_RE.sub("", text)
+    text = _TAG_RE.sub("", text)
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def kural_ids(text: str) -> List[int]:
+    ids = []
+    for match in _KURAL_ID_RE.finditer(text):
+        kid = int(match.group(1))
+        if 1 <= kid <= 1330 and kid not in ids:
+            ids.append(kid)
+    return ids
+
+
+def _summary_line(user: str, assistant: str) -> str:
+    question = " ".join(user.split())
+    if len(question) > 100:
+        question = question[:97] + "..."
+    ids = kural_ids(assistant)
+    return f"- User asked: \"{question}\"" + (f" → discussed Kurals {', '.join(map(str, ids))}" if ids else "")
+
+
+class HistoryReport(NamedTuple):
+    raw_tokens: int
+    compacted_tokens: int
+    summarized_turns: int
+
+    @property
+    def saved(self) -> int:
+        return self.raw_tokens - self.compacted_tokens
+
+
+def compact_history(messages: List[Dict], budget: int = HISTORY_TOKEN_BUDGET) -> Tuple[list, HistoryReport]:
+    """Turns the session's {"role", "content"} messages into LangChain messages within `budget` tokens.
+
+    Past answers are stripped of presentation HTML, and all but the latest of their follow-up
+    suggestions, which the user may answer by number ("2"). Recent turns are kept
+    verbatim from newest to oldest while they fit; anything older is folded into one rolling summary
+    of what was asked and which kural IDs were discussed."""
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+    if not messages:
+        return [], HistoryReport(0, 0, 0)
+
+    raw_tokens = sum(count_tokens(m["content"]) for m in messages[-RAW_HISTORY_WINDOW:])
+
+    latest, past = messages[-1], messages[:-1]
+    last_answer = max((i for i, m in enumerate(past) if m["role"] != "user"), default=None)
+    cleaned = [(m["role"], m["content"] if m["role"] == "user"
+                else strip_presentation(m["content"], keep_follow_ups=i == last_answer))
+               for i, m in enumerate(past)]
+
+    used = count_tokens(latest["content"])
+    kept = []
+    cut = len(cleaned)
+    for i in range(len(cleaned) - 1, -1, -1):
+        cost = count_tokens(cleaned[i][1])
+        if used + cost > budget:
+            break
+        kept.insert(0, cleaned[i])
+        used += cost
+        cut = i
+    # Never start the verbatim window on an orphaned assistant answer
+    if kept and kept[0][0] != "user":
+        used -= count_tokens(kept[0][1])
+        kept.pop(0)
+        cut += 1
+
+    result = []
+    older = cleaned[:cut]
+    summarized = 0
+    if older:
+        lines = []
+        pending_user = None
+        for role, content in older:
+            if role == "user":
+                pending_user = content
+            elif pending_user is not None:
+                lines.append(_summary_line(pending_user, content))
+                pending_user = None
+        if pending_user is not None:
+            lines.append(_summary_line(pending_user, ""))
+        summarized = len(lines)
+
+        header = "Summary of earlier conversation (full text omitted):\n"
+        # Oldest lines go first when the summary itself is over budget
+        while lines and used + count_tokens(header + "\n".join(lines)) > budget:
+            lines.pop(0)
+        if lines:
+            summary = header + "\n".join(lines)
+            used += count_tokens(summary)
+            result.append(SystemMessage(content=summary))
+
+    for role, content in kept:
+        result.append(HumanMessage(content=content) if role == "user" else AIMessage(content=content))
+    result.append(HumanMessage(content=latest["content"]))
+
+    return result, HistoryReport(raw_tokens, used, summarized)
@@ -1,56 +1,374 @@
 import pandas as pd
+import numpy as np
 import os
-from langchain_openai import OpenAIEmbeddings
+import json
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from langchain_community.vectorstores import Chroma
-from langchain_core.documents import Document
 from dotenv import load_dotenv
+from clients import embedding_identity, get_embeddings
+from kural_store import row_to_record, record_metadata
+from bundle import BUNDLE_PATH, open_bundle, write_bundle
+from lexical_index import BM25Index, LEXICAL_INDEX_PATH
+from rate_limiter import BACKGROUND, request_priority
+from verse_index import VERSE_INDEX_PATH, VerseIndex
+from neighbor_graph import NEIGHBOR_GRAPH_PATH, NeighborGraph, neighbor_graph_exists
+from vector_backends import (CHUNK_INDEX_DIR, NUMPY_INDEX_DIR, VECTOR_BACKEND, chunk_index_exists,
+                             export_chunk_index, export_numpy_index, numpy_index_exists)
 
 load_dotenv()
 
-def ingest_data():
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, "thirukural_data.csv")
+# Generated indexes live under INDEX_ROOT (defaults to the app directory)
+INDEX_ROOT = os.getenv("INDEX_ROOT", BASE_DIR)
+DB_DIR = os.path.join(INDEX_ROOT, "chroma_db")
+
+# Tunables for the embedding requests sent during ingestion
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+MAX_WORKERS = int(os.getenv("INGEST_CONCURRENCY", "4"))
+
+# Embed the commentary columns as chunks of their own (on by default for the quantized backend)
+INDEX_COMMENTARIES = os.getenv("INDEX_COMMENTARIES", "1" if VECTOR_BACKEND == "quantized" else "0") == "1"
+# Chroma collection holding commentary chunks; couplets stay in the default collection
+COMMENTARY_COLLECTION = "kural_commentaries"
+
+# Per-kural content hashes of everything already embedded; doubles as the resume checkpoint
+MANIFEST_NAME = "ingest_manifest.json"
+# Written only once the index matches the CSV; readers ignore the directory without it
+COMPLETE_MARKER = ".ingest_complete"
+# Builds write every artifact under STAGING_ROOT, laid out like INDEX_ROOT, and move
+# them into INDEX_ROOT once complete (see _publish).
+# BUILD_LOCK_PATH serializes builds across processes; _build_lock across threads.
+STAGING_ROOT = os.path.join(INDEX_ROOT, "index.staging")
+BUILD_LOCK_PATH = os.path.join(INDEX_ROOT, ".index_build.lock")
+_build_lock = threading.Lock()
+# Which embedding provider and model produced the stored vectors
+EMBEDDING_INFO_NAME = "embedding_model.json"
+# Indexes built before the provider was recorded all came from this model
+LEGACY_EMBEDDING_IDENTITY = "openai:text-embedding-3-small"
+
+
+def index_paths(root: str = INDEX_ROOT) -> dict:
+    """Where each generated artifact lives under `root` (INDEX_ROOT or STAGING_ROOT)."""
+    return {name: os.path.join(root, os.path.basename(path)) for name, path in (
+        ("chroma", DB_DIR), ("lexical", LEXICAL_INDEX_PATH), ("verse", VERSE_INDEX_PATH),
+        ("vectors", NUMPY_INDEX_DIR), ("neighbors", NEIGHBOR_GRAPH_PATH), ("chunks", CHUNK_INDEX_DIR),
+        ("bundle", BUNDLE_PATH))}
+
+
+def index_embedding_identity(persist_directory: str = DB_DIR):
+    path = os.path.join(persist_directory, EMBEDDING_INFO_NAME)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["identity"]
+    if os.path.exists(os.path.join(persist_directory, MANIFEST_NAME)):
+        return LEGACY_EMBEDDING_IDENTITY
+    return None
+
+
+def _save_embedding_identity(persist_directory: str, identity: str):
+    path = os.path.join(persist_directory, EMBEDDING_INFO_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"identity": identity}, f)
+    os.replace(path + ".tmp", path)
+
+
+def is_index_complete(persist_directory: str = DB_DIR) -> bool:
+    """True once a build finished with the embedding provider that is configured now.
+    An index from another provider counts as missing, so queries never meet its vectors."""
+    if not os.path.exists(os.path.join(persist_directory, COMPLETE_MARKER)):
+        return False
+    recorded, configured = index_embedding_identity(persist_directory), embedding_identity()
+    if recorded != configured:
+        print(f"Index was built with {recorded} but {configured} is configured.")
+        return False
+    return True
+
+
+def content_hash(page_content: str, metadata: dict) -> str:
+    payload = page_content + json.dumps(metadata, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _load_manifest(persist_directory: str) -> dict:
+    path = os.path.join(persist_directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(persist_directory: str, manifest: dict):
+    # Write-then-rename so an interrupted save never leaves a truncated checkpoint
+    path = os.path.join(persist_directory, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def _set_complete(persist_directory: str, complete: bool):
+    marker = os.path.join(persist_directory, COMPLETE_MARKER)
+    if complete:
+        with open(marker, "w") as f:
+            f.write("ok")
+    elif os.path.exists(marker):
+        os.remove(marker)
+
+
+def export_bundle(records, identity: str, paths: dict = None):
+    """Packs the records, the couplet embedding matrix and the auxiliary indexes into
+    the kural bundle that the app loads at startup instead of the CSV and Chroma."""
+    paths = paths or index_paths()
+    matrix = np.load(os.path.join(paths["vectors"], "vectors.npy"))
+    with open(os.path.join(paths["vectors"], "metadata.json"), encoding="utf-8") as f:
+        ids = [m["id"] for m in json.load(f)]
+    records = sorted(records, key=lambda r: r["id"])
+    if [r["id"] for r in records] != ids:
+        raise RuntimeError("Vector index does not cover the same kurals as the CSV; re-run ingestion.")
+    aux = {}
+    for name, key in (("lexical_index", "lexical"), ("neighbor_graph", "neighbors"), ("verse_index", "verse")):
+        with open(paths[key], "rb") as f:
+            aux[name] = f.read()
+    write_bundle(records, matrix, aux, identity, path=paths["bundle"])
+
+
+def ingest_data(batch_size: int = BATCH_SIZE, max_workers: int = MAX_WORKERS,
+                index_root: str = INDEX_ROOT):
+    paths = index_paths(index_root)
+    persist_directory = paths["chroma"]
+    os.makedirs(index_root, exist_ok=True)
+
     # 1. Load data
-    data_path = os.path.join(os.path.dirname(__file__), "thirukural_data.csv")
-    df = pd.read_csv(data_path)
-    
-    # 2. Prepare documents for indexing
-    documents = []
+    df = pd.read_csv(DATA_PATH)
+
+    # 2. Prepare the content and metadata for every kural
+    entries = {}
+    records = []
     for _, row in df.iterrows():
         # Combine Tamil and English for bilingual embedding
         # We use a separator that the model can understand
-        kural_tamil = str(row['Kural']).replace('<br />', ' ').strip()
-        kural_english = str(row['Couplet']).strip()
-        
+        record = row_to_record(row)
+        records.append(record)
+
         # This is the "content" that will be converted to vectors
-        page_content = f"Tamil: {kural_tamil}\nEnglish: {kural_english}"
-        
+        page_content = f"Tamil: {record['tamil_kural']}\nEnglish: {record['english_kural']}"
+
         # Prepare metadata for filtering and detailed lookup
-        metadata = {
-            "id": int(row['ID']),
-            "tamil_kural": kural_tamil,
-            "english_kural": kural_english,
-            "adhigaram": str(row['Adhigaram']),
-            "paal": str(row['Paal']),
-            "iyal": str(row['Iyal']),
-            "meaning_tamil": str(row['M_Varadharajanar']),
-            "meaning_english": str(row.get('Meaning', row['Couplet'])) # Fallback if 'Meaning' column name is different
-        }
-        
-        documents.append(Document(page_content=page_content, metadata=metadata))
-    
-    # 3. Initialize Embeddings and Chroma
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    
-    persist_directory = os.path.join(os.path.dirname(__file__), "chroma_db")
-    
-    print(f"Ingesting {len(documents)} Kurals into ChromaDB...")
-    
-    vectorstore = Chroma.from_documents(
-        documents=documents,
-        embedding=embeddings,
-        persist_directory=persist_directory
-    )
-    
+        metadata = record_metadata(record)
+        entries[str(record["id"])] = (page_content, metadata, content_hash(page_content, metadata))
+
+        # Commentary chunks are keyed "<kural id>:<source>"
+        if INDEX_COMMENTARIES:
+            for source, text in record["commentaries"].items():
+                chunk_meta = {"id": record["id"], "source": source}
+                entries[f"{record['id']}:{source}"] = (text, chunk_meta, content_hash(text, chunk_meta))
+
+    # 3. Build the BM25 lexical index and the verse trigram index (local only, so they are always rebuilt)
+    BM25Index.build(records).save(paths["lexical"])
+    VerseIndex.build(records).save(paths["verse"])
+
+    # 4. Initialize Embeddings and Chroma
+    embeddings = get_embeddings()
+    os.makedirs(persist_directory, exist_ok=True)
+    vectorstore = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    commentary_store = Chroma(collection_name=COMMENTARY_COLLECTION, persist_directory=persist_directory,
+                              embedding_function=embeddings)
+
+    manifest = _load_manifest(persist_directory)
+    identity = embedding_identity(embeddings)
+    recorded = index_embedding_identity(persist_directory)
+    if (not manifest and vectorstore._collection.count() > 0) or (manifest and recorded != identity):
+        # Index predates the manifest (its document IDs are unknown), or its vectors
+        # come from another embedding model: either way, start over
+        print(f"Existing index is unusable with {identity}. Rebuilding from scratch...")
+        manifest = {}
+        _save_manifest(persist_directory, manifest)
+        vectorstore.delete_collection()
+        commentary_store.delete_collection()
+        vectorstore = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+        commentary_store = Chroma(collection_name=COMMENTARY_COLLECTION, persist_directory=persist_directory,
+                                  embedding_function=embeddings)
+
+    _save_embedding_identity(persist_directory, identity)
+
+    def collection_for(chunk_id):
+        return commentary_store._collection if ":" in chunk_id else vectorstore._collection
+
+    # 5. Work out what changed since the last (possibly interrupted) run
+    pending = [kid for kid, (_, _, h) in entries.items() if manifest.get(kid) != h]
+    removed = [kid for kid in manifest if kid not in entries]
+
+    if not pending and not removed:
+        if not numpy_index_exists(paths["vectors"]):
+            export_numpy_index(vectorstore, paths["vectors"])
+        if not neighbor_graph_exists(paths["neighbors"]):
+            NeighborGraph.from_numpy_index(records, index_dir=paths["vectors"]).save(paths["neighbors"])
+        if not chunk_index_exists(paths["chunks"], commentaries=INDEX_COMMENTARIES):
+            export_chunk_index(vectorstore, commentary_store, paths["chunks"])
+        bundle = open_bundle(paths["bundle"])
+        if bundle is None or bundle.embedding_identity != identity or bundle.aux("verse_index") is None:
+            export_bundle(records, identity, paths)
+        _set_complete(persist_directory, True)
+        print("Index is up to date. Nothing to ingest.")
+        return
+
+    _set_complete(persist_directory, False)
+
+    if removed:
+        for is_commentary in (False, True):
+            part = [kid for kid in removed if (":" in kid) == is_commentary]
+            if part:
+                collection_for(part[0]).delete(ids=part)
+        for kid in removed:
+            manifest.pop(kid)
+        _save_manifest(persist_directory, manifest)
+
+    print(f"Ingesting {len(pending)} of {len(entries)} Kurals and commentary chunks into ChromaDB "
+          f"(batch size {batch_size}, {max_workers} workers)...")
+
+    # 6. Embed batches concurrently; upsert and checkpoint each batch as it lands
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    def embed_batch(ids):
+        # Ingestion yields to interactive chat turns at the rate-limit scheduler
+        with request_priority(BACKGROUND):
+            return ids, embeddings.embed_documents([entries[kid][0] for kid in ids])
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for ids, vectors in pool.map(embed_batch, batches):
+            for is_commentary in (False, True):
+                part = [i for i, kid in enumerate(ids) if (":" in kid) == is_commentary]
+                if not part:
+                    continue
+                collection_for(ids[part[0]]).upsert(
+                    ids=[ids[i] for i in part],
+                    embeddings=[vectors[i] for i in part],
+                    documents=[entries[ids[i]][0] for i in part],
+                    metadatas=[entries[ids[i]][1] for i in part],
+                )
+            for kid in ids:
+                manifest[kid] = entries[kid][2]
+            _save_manifest(persist_directory, manifest)
+            done += len(ids)
+            print(f"  {done}/{len(pending)} embedded")
+
+    # Mirror the vectors into the memory-mapped index used by the NumPy backend
+    export_numpy_index(vectorstore, paths["vectors"])
+    # 7. Precompute nearest neighbours and chapter siblings for related_kurals
+    NeighborGraph.from_numpy_index(records, index_dir=paths["vectors"]).save(paths["neighbors"])
+    # 8. Quantized chunk index (couplets plus any commentaries) for the quantized backend
+    export_chunk_index(vectorstore, commentary_store, paths["chunks"])
+    # 9. One memory-mappable bundle of records, vectors and the indexes above, for fast startup
+    export_bundle(records, identity, paths)
+
+    _set_complete(persist_directory, True)
     print("Ingestion complete. Database persisted at:", persist_directory)
 
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on `path`, held until the block exits (released by the OS if the process dies)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a+") as f:
+        try:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt
+            while True:
+                try:
+                    # LK_LOCK gives up after ~10 seconds, so keep waiting
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        yield
+
+
+def _publish(staging: str, root: str = INDEX_ROOT):
+    """Moves a finished build's artifacts from `staging` into `root`. chroma_db holds the
+    completion marker, so it is taken down first and put back last: readers that check
+    readiness in between see no index, wait on the build lock, and find the complete new
+    set once it is released. Files are swapped with one os.replace each, so a reader
+    opening the bundle directly gets either the old or the new one. The replaced
+    artifacts stay in index.old until the next publish, for sessions still reading them."""
+    staged, live = index_paths(staging), index_paths(root)
+    old = os.path.join(root, "index.old")
+    shutil.rmtree(old, ignore_errors=True)
+    os.makedirs(old)
+
+    def retire(name):
+        if os.path.isdir(live[name]):
+            os.rename(live[name], os.path.join(old, name))
+
+    retire("chroma")
+    for name in staged:
+        if name == "chroma":
+            continue
+        if os.path.isdir(staged[name]):
+            retire(name)
+            os.rename(staged[name], live[name])
+        else:
+            os.replace(staged[name], live[name])
+    os.rename(staged["chroma"], live["chroma"])
+    shutil.rmtree(staging, ignore_errors=True)
+    _forget_chroma_clients(staged["chroma"], live["chroma"])
+
+
+def _forget_chroma_clients(*directories):
+    """Chroma caches one client per path and reuses it for every later open. Removing the
+    entries for `directories` (without stopping those clients) makes the next open read
+    the files now there, while vectorstores already holding the old clients keep working."""
+    try:
+        from chromadb.api.client import SharedSystemClient
+        systems = SharedSystemClient._identifier_to_system
+    except (ImportError, AttributeError):
+        return
+    # Reference counts are kept: a holder closing an old client must not stop the new one
+    for directory in directories:
+        systems.pop(directory, None)
+
+
+def _stage_live_index():
+    # Copied next to the staging root and renamed in, so a crash mid-copy is never resumed from
+    tmp_root = STAGING_ROOT + ".tmp"
+    shutil.rmtree(STAGING_ROOT, ignore_errors=True)
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    os.makedirs(tmp_root)
+    if os.path.isdir(DB_DIR):
+        shutil.copytree(DB_DIR, index_paths(tmp_root)["chroma"])
+    os.rename(tmp_root, STAGING_ROOT)
+
+
+def build_index(ready=None, force: bool = False, batch_size: int = BATCH_SIZE,
+                max_workers: int = MAX_WORKERS) -> bool:
+    """Single-flight index build. At most one build runs at a time across every thread
+    and process sharing INDEX_ROOT; callers that arrive meanwhile block until it finishes
+    and are served by its result. `ready()` (default: is_index_complete) says whether
+    the index is already usable; `force` builds anyway to pick up CSV changes.
+    Returns True if this call ran the build."""
+    ready = ready or is_index_complete
+    if not force and ready():
+        return False
+    with _build_lock, _file_lock(BUILD_LOCK_PATH):
+        if not force and ready():
+            print("Index was built by another session while waiting.")
+            return False
+        # An interrupted build left its staging Chroma directory behind: resume it. Otherwise
+        # start from a copy of the live one so unchanged kurals are not re-embedded; the other
+        # artifacts are cheap to derive from it and are always rebuilt into the staging root.
+        if not os.path.isdir(index_paths(STAGING_ROOT)["chroma"]):
+            _stage_live_index()
+        ingest_data(batch_size, max_workers, index_root=STAGING_ROOT)
+        _publish(STAGING_ROOT)
+        return True
+
+
 if __name__ == "__main__":
-    ingest_data()
+    build_index(force=True)
@@ -0,0 +1,148 @@
+import os
+import random
+import threading
+from typing import Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, "thirukural_data.csv")
+
+# Aliases accepted for the three Paal (sections). The CSV stores the Tamil names.
+PAAL_ALIASES = {
+    "virtue": "அறத்துப்பால்",
+    "arathuppaal": "அறத்துப்பால்",
+    "aram": "அறத்துப்பால்",
+    "அறம்": "அறத்துப்பால்",
+    "wealth": "பொருட்பால்",
+    "porutpaal": "பொருட்பால்",
+    "porul": "பொருட்பால்",
+    "பொருள்": "பொருட்பால்",
+    "love": "காமத்துப்பால்",
+    "kaamathuppaal": "காமத்துப்பால்",
+    "inbam": "காமத்துப்பால்",
+    "இன்பம்": "காமத்துப்பால்",
+}
+
+# Fields stored as Chroma metadata by ingest.py
+METADATA_FIELDS = (
+    "id", "tamil_kural", "english_kural", "adhigaram",
+    "paal", "iyal", "meaning_tamil", "meaning_english",
+)
+
+
+# Commentary columns indexed as separate retrievable chunks, by the source name stored with each chunk
+COMMENTARY_COLUMNS = {
+    "vilakam": "Vilakam",
+    "kalaingar": "Kalaingar_Urai",
+    "parimezhalagar": "Parimezhalagar_Urai",
+    "solomon_pappaiya": "Solomon_Pappaiya",
+}
+
+
+def clean_kural(text) -> str:
+    """Strips the <br /> markup used in the CSV's Kural column."""
+    return str(text).replace('<br />', ' ').strip()
+
+
+def _commentary(value) -> str:
+    # Missing cells come back from pandas as NaN
+    if value is None or value != value:
+        return ""
+    return " ".join(str(value).split())
+
+
+def row_to_record(row) -> Dict:
+    """Normalizes one CSV row into the record shape shared by ingest and the tools."""
+    return {
+        "id": int(row['ID']),
+        "tamil_kural": clean_kural(row['Kural']),
+        "english_kural": str(row['Couplet']).strip(),
+        "adhigaram": str(row['Adhigaram']),
+        "paal": str(row['Paal']),
+        "iyal": str(row['Iyal']),
+        "meaning_tamil": str(row['M_Varadharajanar']),
+        "meaning_english": str(row.get('Meaning', row['Couplet'])),  # Fallback if 'Meaning' column name is different
+        "adhigaram_id": int(row['Adhigaram_ID']),
+        "transliteration": " ".join(str(row['Transliteration']).split()),
+        "commentaries": {name: text for name, col in COMMENTARY_COLUMNS.items()
+                         if (text := _commentary(row.get(col)))},
+    }
+
+
+def record_metadata(record: Dict) -> Dict:
+    """The subset of a record that is persisted alongside each vector."""
+    return {k: record[k] for k in METADATA_FIELDS}
+
+
+class KuralStore:
+    """In-memory view of the Thirukural corpus with O(1) lookups by ID
+    and precomputed ID lists per Paal, Iyal and Adhigaram."""
+
+    def __init__(self, records: List[Dict]):
+        self.records = records
+        self.by_id = {r["id"]: r for r in records}
+        self.by_paal: Dict[str, List[int]] = {}
+        self.by_iyal: Dict[str, List[int]] = {}
+        self.by_adhigaram: Dict[str, List[int]] = {}
+        for r in records:
+            self.by_paal.setdefault(r["paal"].strip(), []).append(r["id"])
+            self.by_iyal.setdefault(r["iyal"].strip(), []).append(r["id"])
+            self.by_adhigaram.setdefault(r["adhigaram"].strip(), []).append(r["id"])
+
+    @classmethod
+    def from_csv(cls, path: str = DATA_PATH) -> "KuralStore":
+        import pandas as pd
+        df = pd.read_csv(path)
+        return cls([row_to_record(row) for _, row in df.iterrows()])
+
+    @classmethod
+    def from_bundle(cls, bundle) -> "KuralStore":
+        """Loads the records from a kural bundle's columns (no pandas, no CSV parsing).
+        Commentaries are only needed by ingest and are not part of the bundle."""
+        return cls(bundle.records())
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, kural_id: int) -> Optional[Dict]:
+        return self.by_id.get(kural_id)
+
+    def resolve_paal(self, category: str) -> Optional[str]:
+        """Maps an English, transliterated or Tamil category name to the CSV's Paal value."""
+        key = category.strip()
+        if key in self.by_paal:
+            return key
+        return PAAL_ALIASES.get(key.lower())
+
+    def filter_ids(self, paal: Optional[str] = None, adhigaram: Optional[str] = None) -> Optional[List[int]]:
+        """IDs matching every given filter, for restricting vector search. None means no filter."""
+        ids = None
+        if paal:
+            ids = set(self.by_paal.get(self.resolve_paal(paal) or "", []))
+        if adhigaram:
+            chapter = set(self.by_adhigaram.get(adhigaram.strip(), []))
+            ids = chapter if ids is None else ids & chapter
+        return sorted(ids) if ids is not None else None
+
+    def random_by_paal(self, category: str) -> Optional[Dict]:
+        paal = self.resolve_paal(category)
+        ids = self.by_paal.get(paal) if paal else None
+        if not ids:
+            return None
+        return self.by_id[random.choice(ids)]
+
+
+# Process-wide store, loaded once on first use
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_kural_store() -> KuralStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                # The bundle written by ingest loads without pandas; the CSV is the fallback
+                from bundle import open_bundle
+                bundle = open_bundle()
+                _store = KuralStore.from_bundle(bundle) if bundle else KuralStore.from_csv()
+    return _store
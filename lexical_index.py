@@ -0,0 +1,109 @@
+import os
+import re
+import json
+import threading
+import math
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_ROOT = os.getenv("INDEX_ROOT", BASE_DIR)
+LEXICAL_INDEX_PATH = os.path.join(INDEX_ROOT, "lexical_index.json")
+
+# Tamil letters followed by their vowel signs / pulli form one grapheme cluster.
+# Python's \w does not match those combining marks, so it splits Tamil words apart.
+_TAMIL_WORD = "[\u0B80-\u0BFF]+"
+_TOKEN_RE = re.compile(f"{_TAMIL_WORD}|[a-z0-9]+")
+_GRAPHEME_RE = re.compile("[\u0B80-\u0BFF][\u0BBE-\u0BCD\u0BD7]*")
+_MARKUP_RE = re.compile(r"<[^>]+>")
+
+# Tamil is agglutinative (கல்வி, கல்வியின், கல்வியை); a short grapheme prefix acts as a light stem
+STEM_GRAPHEMES = 3
+
+# Fields of a KuralStore record that are indexed
+FIELDS = ("tamil_kural", "english_kural", "transliteration", "meaning_tamil")
+
+
+def graphemes(word: str) -> List[str]:
+    return _GRAPHEME_RE.findall(word)
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits Tamil and Latin text into search tokens. Tamil words also emit a
+    `~`-prefixed stem of their first few grapheme clusters so inflected forms match."""
+    text = _MARKUP_RE.sub(" ", unicodedata.normalize("NFC", str(text))).casefold()
+    tokens = []
+    for tok in _TOKEN_RE.findall(text):
+        tokens.append(tok)
+        if tok[0] >= "\u0B80":
+            tokens.append("~" + "".join(graphemes(tok)[:STEM_GRAPHEMES]))
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, ids: List[int], postings: Dict[str, Dict[str, int]], doc_lens: List[int],
+                 k1: float = 1.5, b: float = 0.75):
+        self.ids = ids
+        self.postings = postings
+        self.doc_lens = doc_lens
+        self.k1 = k1
+        self.b = b
+        self.avg_len = sum(doc_lens) / len(doc_lens) if doc_lens else 0.0
+        n = len(ids)
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in postings.items()}
+
+    @classmethod
+    def build(cls, records: Iterable[Dict]) -> "BM25Index":
+        ids, doc_lens, postings = [], [], {}
+        for doc, r in enumerate(records):
+            counts = Counter(tok for field in FIELDS for tok in tokenize(r[field]))
+            ids.append(r["id"])
+            doc_lens.append(sum(counts.values()))
+            for tok, tf in counts.items():
+                # JSON object keys are strings, so doc positions are stored as strings too
+                postings.setdefault(tok, {})[str(doc)] = tf
+        return cls(ids, postings, doc_lens)
+
+    def save(self, path: str = LEXICAL_INDEX_PATH):
+        # Sessions that find the index missing also build and save it, so each writer needs its own temp file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "doc_lens": self.doc_lens, "postings": self.postings}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_PATH) -> "BM25Index":
+        with open(path, encoding="utf-8") as f:
+            return cls.loads(f.read())
+
+    @classmethod
+    def loads(cls, text) -> "BM25Index":
+        data = json.loads(text)
+        return cls(data["ids"], data["postings"], data["doc_lens"])
+
+    def search(self, query: str, k: int = 5, ids: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        """Returns up to k (kural_id, score) pairs, best first."""
+        allowed = set(ids) if ids is not None else None
+        scores: Dict[int, float] = {}
+        for tok in set(tokenize(query)):
+            idf = self.idf.get(tok)
+            if idf is None:
+                continue
+            for doc, tf in self.postings[tok].items():
+                doc = int(doc)
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lens[doc] / self.avg_len)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        hits = [(self.ids[doc], score) for doc, score in ranked
+                if allowed is None or self.ids[doc] in allowed]
+        return hits[:k]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuses ranked ID lists; each list contributes 1 / (k + rank) per ID."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, kid in enumerate(ranking, start=1):
+            fused[kid] = fused.get(kid, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
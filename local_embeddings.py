@@ -0,0 +1,67 @@
+import os
+import re
+import unicodedata
+import zlib
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from lexical_index import graphemes, tokenize
+
+# Size of the hashed feature space
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "1024"))
+
+_MARKUP_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile("[\u0B80-\u0BFF]+|[a-z0-9]+")
+
+
+def _features(text: str) -> List[str]:
+    """Word tokens (with the Tamil stems from lexical_index) plus character n-grams.
+    Tamil n-grams are taken over grapheme clusters so a vowel sign never ends up
+    separated from its consonant; Latin words use character trigrams."""
+    text = _MARKUP_RE.sub(" ", unicodedata.normalize("NFC", str(text))).casefold()
+    features = tokenize(text)
+    for word in _WORD_RE.findall(text):
+        if word[0] >= "\u0B80":
+            units = ["<"] + graphemes(word) + [">"]
+            features += ["".join(units[i:i + n]) for n in (2, 3) for i in range(len(units) - n + 1)]
+        else:
+            padded = f"<{word}>"
+            features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    return features or ["<empty>"]
+
+
+class HashingEmbeddings(Embeddings):
+    """Offline embedder: signed feature hashing of words and character n-grams,
+    with sublinear term weights and L2 normalization. Runs on the CPU with no model
+    download, so ingest and search work without network access."""
+
+    def __init__(self, dim: int = LOCAL_EMBEDDING_DIM):
+        self.dim = dim
+
+    @property
+    def identity(self) -> str:
+        # Recorded with the index; any change to the featurization must change this string
+        return f"local:hashing-v1-{self.dim}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Featurizing and hashing is plain Python (and holds the GIL, so threads would not
+        help); counting, weighting and normalizing run over the whole batch in NumPy."""
+        if not texts:
+            return []
+        hashes = [[zlib.crc32(feat.encode("utf-8")) for feat in _features(t)] for t in texts]
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), [len(h) for h in hashes])
+        # One key per (text, feature hash) pair, so np.unique counts each feature per text
+        keys, counts = np.unique((rows << 32) | np.fromiter((h for hs in hashes for h in hs), dtype=np.int64),
+                                 return_counts=True)
+        rows, features = keys >> 32, keys & 0xFFFFFFFF
+        weights = (1.0 + np.log(counts)) * np.where(features & 0x80000000, 1.0, -1.0)
+        matrix = np.zeros((len(texts), self.dim))
+        np.add.at(matrix, (rows, features % self.dim), weights)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,86 @@
+import os
+import json
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_ROOT = os.getenv("INDEX_ROOT", BASE_DIR)
+NEIGHBOR_GRAPH_PATH = os.path.join(INDEX_ROOT, "neighbor_graph.json")
+
+# Nearest neighbours kept per kural
+NEIGHBORS = int(os.getenv("NEIGHBOR_GRAPH_K", "10"))
+
+
+class NeighborGraph:
+    """Precomputed "more like this" answers: for every kural, its nearest kurals by
+    embedding cosine and its siblings in the same Adhigaram. Lookups are dict reads,
+    with no embedding request and no vector query."""
+
+    def __init__(self, neighbors: Dict[int, List[Tuple[int, float]]], siblings: Dict[int, List[int]]):
+        self.neighbors = neighbors
+        self.siblings = siblings
+
+    @classmethod
+    def build(cls, matrix, ids: Sequence[int], records: Iterable[Dict], k: int = NEIGHBORS) -> "NeighborGraph":
+        """`matrix` holds one L2-normalized embedding per kural, in the order of `ids`."""
+        import numpy as np
+
+        matrix = np.asarray(matrix, dtype=np.float32)
+        ids = [int(i) for i in ids]
+        k = min(k, len(ids) - 1)
+        neighbors = {}
+        # Row blocks keep the similarity matrix small even for much larger corpora
+        for start in range(0, len(ids), 512):
+            scores = matrix[start:start + 512] @ matrix.T
+            rows = np.arange(scores.shape[0])
+            scores[rows, start + rows] = -np.inf  # a kural is not its own neighbour
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for row, cand in enumerate(top):
+                cand = cand[np.argsort(-scores[row, cand])]
+                neighbors[ids[start + row]] = [(ids[j], round(float(scores[row, j]), 4)) for j in cand]
+
+        chapters: Dict[str, List[int]] = {}
+        for r in records:
+            chapters.setdefault(r["adhigaram"].strip(), []).append(r["id"])
+        siblings = {kid: [other for other in members if other != kid]
+                    for members in chapters.values() for kid in members}
+        return cls(neighbors, siblings)
+
+    @classmethod
+    def from_numpy_index(cls, records: Iterable[Dict], k: int = NEIGHBORS,
+                         index_dir: Optional[str] = None) -> "NeighborGraph":
+        """Builds the graph from the vectors ingest exported for the NumPy backend."""
+        import numpy as np
+        from vector_backends import NUMPY_INDEX_DIR
+
+        index_dir = index_dir or NUMPY_INDEX_DIR
+        matrix = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(index_dir, "metadata.json"), encoding="utf-8") as f:
+            ids = [m["id"] for m in json.load(f)]
+        return cls.build(matrix, ids, records, k=k)
+
+    def save(self, path: str = NEIGHBOR_GRAPH_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"neighbors": self.neighbors, "siblings": self.siblings}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = NEIGHBOR_GRAPH_PATH) -> "NeighborGraph":
+        with open(path, encoding="utf-8") as f:
+            return cls.loads(f.read())
+
+    @classmethod
+    def loads(cls, text) -> "NeighborGraph":
+        data = json.loads(text)
+        # JSON object keys come back as strings
+        return cls({int(kid): [(int(n), s) for n, s in hits] for kid, hits in data["neighbors"].items()},
+                   {int(kid): ids for kid, ids in data["siblings"].items()})
+
+    def related(self, kural_id: int, k: int = 5) -> Optional[Dict[str, List]]:
+        if kural_id not in self.neighbors and kural_id not in self.siblings:
+            return None
+        return {"similar": self.neighbors.get(kural_id, [])[:k], "siblings": self.siblings.get(kural_id, [])}
+
+
+def neighbor_graph_exists(path: str = NEIGHBOR_GRAPH_PATH) -> bool:
+    return os.path.exists(path)
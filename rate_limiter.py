@@ -0,0 +1,243 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import contextvars
+import email.utils
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import httpx
+
+# Client-side limits per endpoint, matching the account's OpenAI tier (0 disables a bucket)
+LLM_RPM = int(os.getenv("OPENAI_LLM_RPM", "500"))
+LLM_TPM = int(os.getenv("OPENAI_LLM_TPM", "200000"))
+EMBEDDING_RPM = int(os.getenv("OPENAI_EMBEDDING_RPM", "3000"))
+EMBEDDING_TPM = int(os.getenv("OPENAI_EMBEDDING_TPM", "1000000"))
+# Seconds of allowance a bucket may save up and spend in one burst
+RATE_LIMIT_BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "1"))
+# Retries of a 429 or 5xx response, and the base of the jittered exponential backoff (seconds)
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "6"))
+RATE_LIMIT_BACKOFF = float(os.getenv("RATE_LIMIT_BACKOFF", "0.5"))
+RATE_LIMIT_MAX_BACKOFF = float(os.getenv("RATE_LIMIT_MAX_BACKOFF", "30"))
+# Completion tokens charged up front for a chat request that sets no max_tokens
+COMPLETION_TOKEN_ESTIMATE = 512
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Request priorities: lower runs first. Chat turns are interactive unless marked otherwise.
+INTERACTIVE = 0
+BACKGROUND = 1
+_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(level: int):
+    """Sends the OpenAI requests made inside the block at `level` (e.g. BACKGROUND for ingestion)."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 a second and holds `burst_seconds` of
+    that. The API enforces its limits over short intervals too, so saving up a whole
+    minute and spending it at once would still draw 429s."""
+
+    def __init__(self, per_minute: int, burst_seconds: float = RATE_LIMIT_BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds) if per_minute else 0.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is now). Requests larger than
+        the bucket wait for a full bucket rather than forever."""
+        if not self.capacity:
+            return 0.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float):
+        if self.capacity:
+            self.level -= min(amount, self.capacity)
+
+
+def retry_after(headers) -> Optional[float]:
+    """The server's requested delay in seconds, from retry-after-ms or retry-after
+    (seconds or an HTTP date), or None when it gave none."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+def endpoint_kind(request: httpx.Request) -> str:
+    return "embeddings" if request.url.path.rstrip("/").endswith("/embeddings") else "llm"
+
+
+def estimate_tokens(request: httpx.Request, kind: str) -> int:
+    # About four bytes of JSON per token, plus the completion for chat requests
+    tokens = len(request.content) // 4
+    return tokens + (COMPLETION_TOKEN_ESTIMATE if kind == "llm" else 0)
+
+
+class RequestScheduler:
+    """Shared gate for every OpenAI request in the process. Each endpoint kind has a
+    request bucket and a token bucket; a request waits until both have room and no
+    higher-priority request on that endpoint is waiting. A 429 pauses the endpoint
+    for everyone until the server's retry-after has passed."""
+
+    def __init__(self, limits: Optional[Dict[str, tuple]] = None, max_retries: int = RATE_LIMIT_MAX_RETRIES,
+                 backoff: float = RATE_LIMIT_BACKOFF, max_backoff: float = RATE_LIMIT_MAX_BACKOFF):
+        limits = limits or {"llm": (LLM_RPM, LLM_TPM), "embeddings": (EMBEDDING_RPM, EMBEDDING_TPM)}
+        self._buckets = {kind: (TokenBucket(rpm), TokenBucket(tpm)) for kind, (rpm, tpm) in limits.items()}
+        self._waiting = {kind: [0, 0] for kind in limits}
+        self._paused_until = {kind: 0.0 for kind in limits}
+        self._lock = threading.Lock()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.counters = {"requests": 0, "retries": 0, "rate_limited": 0, "wait_s": 0.0}
+
+    def _try_acquire(self, kind: str, tokens: int, priority: int) -> float:
+        """Takes a request slot and `tokens` and returns 0, or returns how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until[kind]:
+                return self._paused_until[kind] - now
+            if any(self._waiting[kind][:priority]):
+                return 0.05
+            requests, token_bucket = self._buckets[kind]
+            wait = max(requests.wait_time(1, now), token_bucket.wait_time(tokens, now))
+            if wait:
+                return wait
+            requests.take(1)
+            token_bucket.take(tokens)
+            self.counters["requests"] += 1
+            return 0.0
+
+    def _enter(self, kind: str, priority: int, delta: int):
+        with self._lock:
+            self._waiting[kind][priority] += delta
+
+    def acquire(self, kind: str, tokens: int, priority: int = INTERACTIVE) -> float:
+        """Blocks until the request may be sent. Returns the seconds spent waiting."""
+        start = time.monotonic()
+        wait = self._try_acquire(kind, tokens, priority)
+        if wait:
+            self._enter(kind, priority, 1)
+            try:
+                while wait:
+                    time.sleep(min(wait, 1.0))
+                    wait = self._try_acquire(kind, tokens, priority)
+            finally:
+                self._enter(kind, priority, -1)
+        return self._waited(start)
+
+    async def aacquire(self, kind: str, tokens: int, priority: int = INTERACTIVE) -> float:
+        start = time.monotonic()
+        wait = self._try_acquire(kind, tokens, priority)
+        if wait:
+            self._enter(kind, priority, 1)
+            try:
+                while wait:
+                    await asyncio.sleep(min(wait, 1.0))
+                    wait = self._try_acquire(kind, tokens, priority)
+            finally:
+                self._enter(kind, priority, -1)
+        return self._waited(start)
+
+    def _waited(self, start: float) -> float:
+        waited = time.monotonic() - start
+        with self._lock:
+            self.counters["wait_s"] += waited
+        return waited
+
+    def retry_delay(self, kind: str, response: httpx.Response, attempt: int) -> float:
+        """Delay before retrying `response`: the server's retry-after plus a little jitter
+        when given, otherwise full-jitter exponential backoff. A 429 also pauses the
+        endpoint for every caller, so the whole process backs off together."""
+        delay = retry_after(response.headers)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        else:
+            delay += random.uniform(0, self.backoff)
+        with self._lock:
+            self.counters["retries"] += 1
+            if response.status_code == 429:
+                self.counters["rate_limited"] += 1
+                self._paused_until[kind] = max(self._paused_until[kind], time.monotonic() + delay)
+        return delay
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+
+SCHEDULER = RequestScheduler()
+
+
+class ScheduledTransport(httpx.BaseTransport):
+    """httpx transport that sends each request through the scheduler and retries
+    rate-limited and transient server errors."""
+
+    def __init__(self, transport: httpx.BaseTransport, scheduler: RequestScheduler = SCHEDULER):
+        self._transport = transport
+        self._scheduler = scheduler
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        kind = endpoint_kind(request)
+        tokens = estimate_tokens(request, kind)
+        priority = _priority.get()
+        for attempt in range(self._scheduler.max_retries + 1):
+            self._scheduler.acquire(kind, tokens, priority)
+            response = self._transport.handle_request(request)
+            if response.status_code not in RETRY_STATUSES or attempt == self._scheduler.max_retries:
+                return response
+            delay = self._scheduler.retry_delay(kind, response, attempt)
+            response.close()
+            time.sleep(delay)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncScheduledTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, scheduler: RequestScheduler = SCHEDULER):
+        self._transport = transport
+        self._scheduler = scheduler
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        kind = endpoint_kind(request)
+        tokens = estimate_tokens(request, kind)
+        priority = _priority.get()
+        for attempt in range(self._scheduler.max_retries + 1):
+            await self._scheduler.aacquire(kind, tokens, priority)
+            response = await self._transport.handle_async_request(request)
+            if response.status_code not in RETRY_STATUSES or attempt == self._scheduler.max_retries:
+                return response
+            delay = self._scheduler.retry_delay(kind, response, attempt)
+            await response.aclose()
+            await asyncio.sleep(delay)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
@@ -0,0 +1,100 @@
+import re
+import random
+from typing import Dict, Optional, Tuple
+
+# app.py appends formatting instructions to the latest user turn; routing only looks at what the user typed
+INSTRUCTION_MARKER = "(IMPORTANT SYSTEM INSTRUCTION"
+
+MAX_KURAL_ID = 1330
+
+_WORD_RE = re.compile(r"[\u0B80-\u0BFF]+|[a-z]+|\d+")
+
+# Words that name a kural
+KURAL_WORDS = {"kural", "kurals", "couplet", "thirukural"}
+# "no 391", "number 391": they name a kural only beside a kural word; alone they may pick a listed option
+NUMBER_WORDS = {"number", "no"}
+# Inflected forms of (திருக்)குறள், singular and plural: குறள், குறளை, குறளின், குறள்களில்...
+# Whole words only, so குறை or குறிப்பு do not count.
+_TAMIL_KURAL_RE = re.compile("(?:திருக்)?குறள(?:்கள)?(?:்|ை|ைப்|ைக்|ால்|ுக்கு|ின்|ில்|து|ும்|ோ|ே)")
+
+# Only an explicit ask for chance: "some kurals about wealth" wants a topical search, not one random couplet.
+# "another" and "வேறு" are left out: they ask for something beyond the conversation so far, which only the agent knows
+RANDOM_WORDS = {"random", "surprise", "சீரற்ற", "தற்செயலான"}
+
+CATEGORY_WORDS = {
+    "virtue": "virtue", "aram": "virtue", "arathuppaal": "virtue", "அறம்": "virtue", "அறத்துப்பால்": "virtue",
+    "wealth": "wealth", "porul": "wealth", "porutpaal": "wealth", "பொருள்": "wealth", "பொருட்பால்": "wealth",
+    "love": "love", "inbam": "love", "kaamathuppaal": "love", "காதல்": "love", "இன்பம்": "love",
+    "காமத்துப்பால்": "love",
+}
+
+# "kurals similar to 391", "391 போன்ற குறள்கள்"
+SIMILAR_WORDS = {"similar", "related", "like", "neighbours", "neighbors", "போன்ற", "ஒத்த", "தொடர்புடைய", "இதுபோன்ற"}
+
+# Words that may surround a routable request without changing its meaning
+FILLER_WORDS = {
+    "a", "an", "the", "me", "with", "give", "show", "tell", "share", "pick", "get", "one", "please", "from", "on",
+    "about", "in", "of", "for", "category", "section", "paal", "pal", "i", "want", "can", "you", "could",
+    "would", "like", "to", "see", "read", "explain", "explanation", "meaning", "what", "is", "does", "say",
+    "detail", "details", "detailed", "its", "it", "mean", "means", "st", "nd", "rd", "th", "any", "some",
+    "ஒரு", "பற்றி", "சொல்", "சொல்லுங்கள்", "சொல்லு", "கொடு", "கொடுங்கள்", "தாருங்கள்", "காட்டு", "காட்டுங்கள்",
+    "விளக்கம்", "விளக்கு", "விளக்குங்கள்", "என்ன", "எண்", "இருந்து", "பாலில்", "பால்", "வேண்டும்", "வது", "ஆவது",
+    "ஏதாவது", "ஏதேனும்",
+}
+
+# A numbered or bulleted line, such as the follow-up suggestions that close each answer
+_OPTION_RE = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+\S", re.M)
+
+# Return type: (tool name, tool arguments)
+Route = Tuple[str, Dict]
+
+
+def user_text(content: str) -> str:
+    return content.split(INSTRUCTION_MARKER, 1)[0].strip()
+
+
+def _is_kural_word(word: str) -> bool:
+    return word in KURAL_WORDS or _TAMIL_KURAL_RE.fullmatch(word) is not None
+
+
+def route(content: str, previous: Optional[str] = None) -> Optional[Route]:
+    """Maps an unambiguous "explain kural N", "kurals similar to N" or "random kural [from X]" message,
+    in Tamil or English, to the tool that answers it. Returns None otherwise.
+    `previous` is the assistant's last answer, if any."""
+    words = _WORD_RE.findall(user_text(content).casefold())
+    if not words:
+        return None
+
+    numbers = [w for w in words if w.isdigit()]
+    others = [w for w in words if not w.isdigit()]
+
+    # "explain kural 391", "குறள் 391 விளக்கம்", or just "391"
+    if len(numbers) == 1 and 1 <= int(numbers[0]) <= MAX_KURAL_ID:
+        kural_id = int(numbers[0])
+        named = any(_is_kural_word(w) for w in others)
+        known = lambda w: _is_kural_word(w) or w in FILLER_WORDS or w in NUMBER_WORDS
+        # A bare "2", "no 2" or "number 2, please" after an answer that listed options picks one of them
+        if not named and previous and all(known(w) for w in others) \
+                and kural_id <= len(_OPTION_RE.findall(previous)):
+            return None
+        # "similar kurals to 391", "more like kural 391" (but not "i would like kural 391")
+        similar = [w for w in others if w in SIMILAR_WORDS]
+        if any(w != "like" for w in similar) or ("more" in others and "like" in others):
+            if all(known(w) or w in SIMILAR_WORDS or w in ("more", "this") for w in others):
+                return "related_kurals", {"kural_id": kural_id}
+            return None
+        # Otherwise only a kural word, or nothing but "no"/"number", makes the number a kural ID
+        if (named or all(w in NUMBER_WORDS for w in others)) and all(known(w) for w in others):
+            return "get_kural_explanation", {"kural_id": kural_id}
+        return None
+
+    # "random kural on love", "காதல் பற்றி சீரற்ற ஒரு குறள்"
+    if not numbers and any(w in RANDOM_WORDS for w in words) and any(_is_kural_word(w) for w in words):
+        categories = {CATEGORY_WORDS[w] for w in words if w in CATEGORY_WORDS}
+        known = all(w in RANDOM_WORDS or w in CATEGORY_WORDS or w in FILLER_WORDS or _is_kural_word(w)
+                    for w in words)
+        if known and len(categories) <= 1:
+            category = categories.pop() if categories else random.choice(["virtue", "wealth", "love"])
+            return "get_random_kural_by_category", {"category": category}
+
+    return None
@@ -0,0 +1,121 @@
+"""Cold-start profiler for the app.
+
+    python app.py --profile-startup [--budget SECONDS]
+
+Reports (1) cumulative import time per top-level package when the app's own
+modules are imported in a fresh interpreter, and (2) how long each lazily
+initialized resource takes on first use. With --budget, exits non-zero when the
+cold import of the UI's startup path exceeds that many seconds, so it can gate CI.
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def app_imports() -> str:
+    """app.py's module-level imports as one statement, so the profile follows app.py as it changes."""
+    with open(os.path.join(BASE_DIR, "app.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        modules += [name for name in names if name not in modules]
+    return "import " + ", ".join(modules)
+
+
+# What app.py imports before its first render
+STARTUP_IMPORTS = app_imports()
+
+# Default budget for the cold import of the startup path, in seconds
+IMPORT_BUDGET_S = float(os.getenv("STARTUP_IMPORT_BUDGET_S", "3.0"))
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_imports(statement: str = STARTUP_IMPORTS):
+    """Runs `statement` under -X importtime in a fresh interpreter.
+    Returns (wall seconds, {top-level package: cumulative seconds})."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                          cwd=BASE_DIR, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+
+    per_package = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        # Only outermost imports (one space of indent) carry a package's full cumulative cost
+        if match and len(match.group(3)) == 1:
+            package = match.group(4).split(".")[0]
+            per_package[package] = per_package.get(package, 0.0) + int(match.group(2)) / 1e6
+    return wall, per_package
+
+
+def profile_init():
+    """Times the first use of each lazily created resource, in dependency order."""
+    # Constructing the clients needs a key but makes no request
+    os.environ.setdefault("OPENAI_API_KEY", "sk-startup-profile")
+    sys.path.insert(0, BASE_DIR)
+
+    steps = []
+
+    def step(name, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+            steps.append((name, time.perf_counter() - start, ""))
+        except Exception as e:
+            steps.append((name, time.perf_counter() - start, f"failed: {e}"))
+
+    from kural_store import get_kural_store
+    import tools
+    import agent
+    from ingest import is_index_complete, DB_DIR
+
+    step("kural_store.get_kural_store", get_kural_store)
+    step("tools.get_lexical_index", tools.get_lexical_index)
+    step("tools.get_verse_index", tools.get_verse_index)
+    step("agent.get_shared_agent", agent.get_shared_agent)
+    if is_index_complete(DB_DIR):
+        step("tools.get_search_backend", tools.get_search_backend)
+    else:
+        steps.append(("tools.get_search_backend", 0.0, "skipped: no index built yet"))
+    return steps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile app cold start")
+    parser.add_argument("--profile-startup", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_S,
+                        help="Fail if the cold startup import exceeds this many seconds")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    wall, per_package = profile_imports()
+    print(f"Cold import of startup path: {wall:.3f}s  ({STARTUP_IMPORTS})")
+    for package, seconds in sorted(per_package.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {package:<28} {seconds * 1000:8.1f} ms")
+
+    print("\nFirst-use initialization:")
+    for name, seconds, note in profile_init():
+        print(f"  {name:<28} {seconds * 1000:8.1f} ms  {note}")
+
+    if wall > args.budget:
+        print(f"\nFAIL: cold import {wall:.3f}s exceeds budget {args.budget:.3f}s")
+        return 1
+    print(f"\nOK: cold import within budget {args.budget:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,15 @@
+import re
+
+_OPEN_DIV_RE = re.compile(r"<div\b[^>]*>")
+_CLOSE_DIV_RE = re.compile(r"</div\s*>")
+
+
+def renderable_html(text: str) -> str:
+    """Makes a partially streamed answer safe to render: a tag cut off mid-way
+    (e.g. `<div cla`) is held back, and any <div> still open, such as a
+    `kural-highlight` block whose closing tag hasn't arrived yet, is closed."""
+    last_open = text.rfind("<")
+    if last_open > text.rfind(">"):
+        text = text[:last_open]
+    unclosed = len(_OPEN_DIV_RE.findall(text)) - len(_CLOSE_DIV_RE.findall(text))
+    return text + "</div>" * max(unclosed, 0)
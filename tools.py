@@ -1,65 +1,277 @@
 import os
-import random
-import pandas as pd
+import asyncio
+import threading
 from dotenv import load_dotenv
 
 # Load .env from the same directory as this script FIRST
 load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain_core.tools import tool
-from typing import List
+from typing import List, Optional
+from kural_store import get_kural_store
 
 # Setup paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "thirukural_data.csv")
-DB_DIR = os.path.join(BASE_DIR, "chroma_db")
+INDEX_ROOT = os.getenv("INDEX_ROOT", BASE_DIR)
+DB_DIR = os.path.join(INDEX_ROOT, "chroma_db")
 
-# Lazy initialization of vectorstore
+# "hybrid" (BM25 + vector, fused), "vector", or "lexical" (BM25 only, no network)
+SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid").lower()
+# Candidates taken from each ranking before fusion
+FUSION_CANDIDATES = 20
+
+# Lazy initialization of vectorstore, query embeddings and search backend.
+# These are shared by every session in the process; the lock makes first use single-shot.
 _vectorstore = None
+_embeddings = None
+_search_backend = None
+_lexical_index = None
+_neighbor_graph = None
+_verse_index = None
+_init_lock = threading.RLock()
+
+# Heavy dependencies (pandas, Chroma, NumPy, the OpenAI client) are imported on first use
+# so importing this module, and with it the Streamlit app, stays cheap.
+from lexical_index import BM25Index, LEXICAL_INDEX_PATH, reciprocal_rank_fusion
+from tracing import span
 
-from ingest import ingest_data
-import shutil
+def get_query_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        with _init_lock:
+            if _embeddings is None:
+                from clients import embedding_identity, get_embeddings
+                from embedding_cache import CachedQueryEmbeddings
+                # Repeated queries are served from the local cache instead of the API;
+                # entries are keyed by provider and model, so switching providers never reuses them
+                inner = get_embeddings()
+                _embeddings = CachedQueryEmbeddings(inner, model_name=embedding_identity(inner))
+    return _embeddings
 
 def get_vectorstore():
     global _vectorstore
-    
-    # Check if vectorstore exists
-    if not os.path.exists(DB_DIR) or not os.listdir(DB_DIR):
-        print("Vectorstore not found. Building fresh index...")
-        ingest_data()
-        
     if _vectorstore is None:
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-        _vectorstore = Chroma(persist_directory=DB_DIR, embedding_function=embeddings)
+        with _init_lock:
+            from langchain_community.vectorstores import Chroma
+            from ingest import build_index
+            # Only a build that finished (commit marker present) counts as an index. Concurrent
+            # sessions and processes wait for one shared build instead of each starting their own.
+            build_index()
+            if _vectorstore is None:
+                _vectorstore = Chroma(persist_directory=DB_DIR, embedding_function=get_query_embeddings())
     return _vectorstore
 
-@tool
-def search_kurals(query: str) -> str:
-    """Semantic search to find top 5 related Kurals based on a word or context. 
-    Input can be in Tamil or English."""
-    vs = get_vectorstore()
-    results = vs.similarity_search(query, k=5)
+def _current_bundle():
+    """The kural bundle, if ingest wrote one for this CSV with the configured embeddings."""
+    from bundle import open_bundle
+    from clients import embedding_identity
+    bundle = open_bundle()
+    return bundle if bundle is not None and bundle.embedding_identity == embedding_identity() else None
+
+def get_search_backend():
+    """Returns the retrieval backend selected by the VECTOR_BACKEND setting."""
+    global _search_backend
+    if _search_backend is None:
+        with _init_lock:
+            if _search_backend is None:
+                from vector_backends import VECTOR_BACKEND, ChromaBackend, NumpyBackend, QuantizedBackend, chunk_index_exists
+                from ingest import INDEX_COMMENTARIES, build_index, is_index_complete
+                if VECTOR_BACKEND == "quantized":
+                    # A chunk index built with the other INDEX_COMMENTARIES setting does not count
+                    build_index(lambda: is_index_complete(DB_DIR) and chunk_index_exists(commentaries=INDEX_COMMENTARIES))
+                    _search_backend = QuantizedBackend(get_query_embeddings())
+                elif VECTOR_BACKEND == "numpy":
+                    # The embedding matrix is memory-mapped from the bundle; Chroma is not opened
+                    build_index(lambda: is_index_complete(DB_DIR) and _current_bundle() is not None)
+                    _search_backend = NumpyBackend.from_bundle(get_query_embeddings(), _current_bundle())
+                else:
+                    _search_backend = ChromaBackend(get_vectorstore())
+    return _search_backend
+
+def get_lexical_index():
+    global _lexical_index
+    if _lexical_index is None:
+        with _init_lock:
+            if _lexical_index is None:
+                from bundle import open_bundle
+                bundle = open_bundle()
+                serialized = bundle.aux("lexical_index") if bundle else None
+                if serialized:
+                    _lexical_index = BM25Index.loads(serialized)
+                elif os.path.exists(LEXICAL_INDEX_PATH):
+                    _lexical_index = BM25Index.load()
+                else:
+                    _lexical_index = BM25Index.build(get_kural_store().records)
+                    _lexical_index.save()
+    return _lexical_index
+
+def get_neighbor_graph():
+    global _neighbor_graph
+    if _neighbor_graph is None:
+        with _init_lock:
+            if _neighbor_graph is None:
+                from neighbor_graph import NeighborGraph, neighbor_graph_exists
+                from ingest import build_index, is_index_complete
+                from bundle import open_bundle
+                bundle = open_bundle()
+                serialized = bundle.aux("neighbor_graph") if bundle else None
+                if serialized:
+                    _neighbor_graph = NeighborGraph.loads(serialized)
+                else:
+                    # Indexes built before the graph existed: ingest only exports what is missing
+                    build_index(lambda: is_index_complete(DB_DIR) and neighbor_graph_exists())
+                    _neighbor_graph = NeighborGraph.load()
+    return _neighbor_graph
+
+def get_verse_index():
+    global _verse_index
+    if _verse_index is None:
+        with _init_lock:
+            if _verse_index is None:
+                from verse_index import VERSE_INDEX_PATH, VerseIndex
+                from bundle import open_bundle
+                bundle = open_bundle()
+                serialized = bundle.aux("verse_index") if bundle else None
+                if serialized:
+                    _verse_index = VerseIndex.loads(serialized)
+                elif os.path.exists(VERSE_INDEX_PATH):
+                    _verse_index = VerseIndex.load()
+                else:
+                    _verse_index = VerseIndex.build(get_kural_store().records)
+                    _verse_index.save()
+    return _verse_index
+
+def identify_verse(text: str, ids: Optional[List[int]] = None) -> Optional[int]:
+    """The kural whose verse `text` quotes (partially, misspelled or transliterated), if one clearly matches."""
+    index = get_verse_index()
+    with span("verse_index", "lexical"):
+        return index.identify(text, ids=ids)
+
+def verse_fast_path(query: str, k: int, ids: Optional[List[int]] = None) -> Optional[List[int]]:
+    """When the query quotes a kural, that kural followed by BM25 results, with no embedding request.
+    Embedding search ranks paraphrases of a verse above the verse itself."""
+    kural_id = identify_verse(query, ids)
+    if kural_id is None:
+        return None
+    return [kural_id] + [kid for kid in lexical_search(query, k, ids) if kid != kural_id][:k - 1]
+
+def lexical_search(query: str, k: int, ids: Optional[List[int]] = None) -> List[int]:
+    index = get_lexical_index()
+    with span("bm25", "lexical"):
+        return [kid for kid, _ in index.search(query, k=k, ids=ids)]
+
+def vector_search(query: str, k: int, ids: Optional[List[int]] = None) -> List[int]:
+    backend = get_search_backend()
+    vector_q = backend.embeddings.embed_query(query)
+    with span(type(backend).__name__, "vector_query"):
+        return [m['id'] for m, _ in backend.search_by_vectors([vector_q], k=k, ids=ids)[0]]
+
+def rank_kurals(query: str, k: int = 5, ids: Optional[List[int]] = None) -> List[int]:
+    """Kural IDs for a query, best first, according to SEARCH_MODE."""
+    if SEARCH_MODE == "lexical":
+        return lexical_search(query, k, ids)
+    if SEARCH_MODE == "vector":
+        return vector_search(query, k, ids)
     
+    lexical = lexical_search(query, FUSION_CANDIDATES, ids)
+    vector = vector_search(query, FUSION_CANDIDATES, ids)
+    return [kid for kid, _ in reciprocal_rank_fusion([lexical, vector])][:k]
+
+# Upper bound on queries in one search_kurals_batch call
+MAX_BATCH_QUERIES = 6
+
+def _fuse_batch(queries: List[str], vector_lists: List[List[int]], k: int,
+                ids: Optional[List[int]]) -> List[List[int]]:
+    if SEARCH_MODE == "vector":
+        return [v[:k] for v in vector_lists]
+    return [[kid for kid, _ in reciprocal_rank_fusion([lexical_search(q, FUSION_CANDIDATES, ids), v])][:k]
+            for q, v in zip(queries, vector_lists)]
+
+def rank_kurals_batch(queries: List[str], k: int = 5, ids: Optional[List[int]] = None) -> List[List[int]]:
+    """rank_kurals for several queries with one embedding request and one vectorized top-k."""
+    if SEARCH_MODE == "lexical":
+        return [lexical_search(q, k, ids) for q in queries]
+    
+    backend = get_search_backend()
+    vectors = backend.embeddings.embed_queries(queries)
+    n = k if SEARCH_MODE == "vector" else FUSION_CANDIDATES
+    with span(type(backend).__name__, "vector_query", queries=len(queries)):
+        hits = backend.search_by_vectors(vectors, k=n, ids=ids)
+    return _fuse_batch(queries, [[m['id'] for m, _ in h] for h in hits], k, ids)
+
+def dedupe_rankings(rankings: List[List[int]], k: int) -> List[List[int]]:
+    """Keeps each kural only under the first query that ranked it, up to k per query."""
+    seen = set()
+    groups = []
+    for ranking in rankings:
+        group = [kid for kid in ranking if kid not in seen][:k]
+        seen.update(group)
+        groups.append(group)
+    return groups
+
+def _batch_queries(queries: List[str]) -> List[str]:
+    unique = []
+    for q in queries:
+        q = q.strip()
+        if q and q not in unique:
+            unique.append(q)
+    return unique[:MAX_BATCH_QUERIES]
+
+def format_batch_results(queries: List[str], groups: List[List[int]]) -> str:
+    store = get_kural_store()
+    output = ""
+    for query, kural_ids in zip(queries, groups):
+        output += f"Results for \"{query}\":\n"
+        if not kural_ids:
+            output += "(no new Kurals beyond those listed above)\n\n"
+            continue
+        for i, kid in enumerate(kural_ids):
+            m = store.get(kid)
+            output += f"{i+1}. ID: {m['id']} | Category: {m['paal']}\n"
+            output += f"Tamil: {m['tamil_kural']}\n"
+            output += f"English: {m['english_kural']}\n"
+        output += "\n"
+    return output
+
+def format_search_results(kural_ids: List[int]) -> str:
+    store = get_kural_store()
     output = "Top 5 Related Kurals:\n\n"
-    for i, res in enumerate(results):
-        m = res.metadata
+    for i, kid in enumerate(kural_ids):
+        m = store.get(kid)
         output += f"{i+1}. ID: {m['id']} | Category: {m['paal']}\n"
         output += f"Tamil: {m['tamil_kural']}\n"
         output += f"English: {m['english_kural']}\n\n"
     return output
 
+@tool
+def search_kurals(query: str, paal: Optional[str] = None) -> str:
+    """Search to find top 5 related Kurals based on a word or context. 
+    Input can be in Tamil, English or the transliteration. Optionally restrict to one Paal (Virtue, Wealth or Love)."""
+    ids = get_kural_store().filter_ids(paal=paal) if paal else None
+    return format_search_results(verse_fast_path(query, 5, ids) or rank_kurals(query, k=5, ids=ids))
+
+@tool
+def search_kurals_batch(queries: List[str], paal: Optional[str] = None) -> str:
+    """Search several concepts at once, e.g. ["patience", "anger"] for a question about both.
+    Returns the top 3 Kurals for each query, without repeating a Kural across queries.
+    Queries can be in Tamil, English or the transliteration. Optionally restrict to one Paal."""
+    queries = _batch_queries(queries)
+    if not queries:
+        return "No queries given."
+    ids = get_kural_store().filter_ids(paal=paal) if paal else None
+    # Over-fetch so each query still has 3 Kurals after duplicates are dropped
+    rankings = rank_kurals_batch(queries, k=3 * len(queries), ids=ids)
+    return format_batch_results(queries, dedupe_rankings(rankings, 3))
+
 @tool
 def get_kural_explanation(kural_id: int) -> str:
     """Provides a detailed explanation for a specific Kural ID in both Tamil and English."""
-    vs = get_vectorstore()
-    results = vs.get(where={"id": kural_id})
+    m = get_kural_store().get(kural_id)
     
-    if not results['documents']:
+    if m is None:
         return f"Kural with ID {kural_id} not found."
     
-    m = results['metadatas'][0]
     output = f"Explanation for Kural {kural_id}:\n\n"
     output += f"Tamil Kural: {m['tamil_kural']}\n"
     output += f"English Kural: {m['english_kural']}\n\n"
@@ -67,33 +279,124 @@ def get_kural_explanation(kural_id: int) -> str:
     output += f"English Meaning: {m['meaning_english']}\n"
     return output
 
+@tool
+def related_kurals(kural_id: int) -> str:
+    """Finds Kurals similar to a given Kural ID ("more like this"), plus the other Kurals in its Adhigaram.
+    Use it for follow-ups about a Kural already shown; it needs no new search."""
+    store = get_kural_store()
+    m = store.get(kural_id)
+    related = get_neighbor_graph().related(kural_id) if m else None
+    
+    if related is None:
+        return f"Kural with ID {kural_id} not found."
+    
+    output = f"Kurals similar to Kural {kural_id}:\n\n"
+    for i, (kid, _) in enumerate(related["similar"]):
+        n = store.get(kid)
+        output += f"{i+1}. ID: {n['id']} | Adhigaram: {n['adhigaram']} | Category: {n['paal']}\n"
+        output += f"Tamil: {n['tamil_kural']}\n"
+        output += f"English: {n['english_kural']}\n\n"
+    output += f"Other Kurals in the same Adhigaram ({m['adhigaram']}):\n"
+    for kid in related["siblings"]:
+        output += f"- ID: {kid} | English: {store.get(kid)['english_kural']}\n"
+    return output
+
+@tool
+def find_kural_by_verse(verse_text: str) -> str:
+    """Identifies a Kural from a line or fragment of its verse, in Tamil or in transliteration,
+    even when partly misremembered or misspelled. Use it when the user quotes the words of a Kural."""
+    store = get_kural_store()
+    hits = get_verse_index().search(verse_text, k=3)
+    
+    if not hits:
+        return f"No Kural verse resembles: {verse_text}"
+    
+    kural_id = identify_verse(verse_text)
+    output = f"Verse match: Kural {kural_id}\n\n" if kural_id else "No single clear match; closest verses:\n\n"
+    for i, (kid, score) in enumerate(hits):
+        m = store.get(kid)
+        output += f"{i+1}. ID: {m['id']} | Adhigaram: {m['adhigaram']} | Match: {score:.0%}\n"
+        output += f"Tamil: {m['tamil_kural']}\n"
+        output += f"Transliteration: {m['transliteration']}\n"
+        output += f"English: {m['english_kural']}\n\n"
+    return output
+
 @tool
 def get_random_kural_by_category(category: str) -> str:
     """Pulls up a random Kural from a specific category (Paal). 
     Categories include: Arathuppaal (Virtue), Porutpaal (Wealth), Kaamathuppaal (Love)."""
-    df = pd.read_csv(DATA_PATH)
+    store = get_kural_store()
+    m = store.random_by_paal(category)
     
-    # Simple normalization for category matching
-    cat_map = {
-        "virtue": "Arathuppaal",
-        "wealth": "Porutpaal",
-        "love": "Kaamathuppaal",
-        "அறத்துப்பால்": "Arathuppaal",
-        "பொருட்பால்": "Porutpaal",
-        "காமத்துப்பால்": "Kaamathuppaal"
-    }
+    if m is None:
+        return f"No Kurals found for category: {category}. Try Arathuppaal, Porutpaal, or Kaamathuppaal."
     
-    target_cat = cat_map.get(category.lower(), category)
-    filtered = df[df['Paal'] == target_cat]
+    output = f"Random Kural from {m['paal']}:\n\n"
+    output += f"ID: {m['id']}\n"
+    output += f"Tamil: {m['tamil_kural']}\n"
+    output += f"English: {m['english_kural']}\n"
+    return output
+
+
+# --- Async variants ---
+# Attached to the tools below as their coroutines, so agent.ainvoke awaits the
+# embedding request on the shared connection pool instead of blocking a thread.
+
+async def arank_kurals(query: str, k: int = 5, ids: Optional[List[int]] = None) -> List[int]:
+    if SEARCH_MODE == "lexical":
+        return rank_kurals(query, k=k, ids=ids)
     
-    if filtered.empty:
-        return f"No Kurals found for category: {category}. Try Arathuppaal, Porutpaal, or Kaamathuppaal."
+    backend = _search_backend or await asyncio.to_thread(get_search_backend)
+    n = k if SEARCH_MODE == "vector" else FUSION_CANDIDATES
+    vector_q = await backend.embeddings.aembed_query(query)
+    with span(type(backend).__name__, "vector_query"):
+        hits = (await asyncio.to_thread(backend.search_by_vectors, [vector_q], n, ids))[0]
+    vector = [m['id'] for m, _ in hits]
+    if SEARCH_MODE == "vector":
+        return vector
     
-    row = filtered.sample(n=1).iloc[0]
-    kural_tamil = str(row['Kural']).replace('<br />', ' ').strip()
+    lexical = lexical_search(query, FUSION_CANDIDATES, ids)
+    return [kid for kid, _ in reciprocal_rank_fusion([lexical, vector])][:k]
+
+async def asearch_kurals(query: str, paal: Optional[str] = None) -> str:
+    ids = get_kural_store().filter_ids(paal=paal) if paal else None
+    return format_search_results(verse_fast_path(query, 5, ids) or await arank_kurals(query, k=5, ids=ids))
+
+async def arank_kurals_batch(queries: List[str], k: int = 5, ids: Optional[List[int]] = None) -> List[List[int]]:
+    if SEARCH_MODE == "lexical":
+        return rank_kurals_batch(queries, k=k, ids=ids)
     
-    output = f"Random Kural from {target_cat}:\n\n"
-    output += f"ID: {row['ID']}\n"
-    output += f"Tamil: {kural_tamil}\n"
-    output += f"English: {row['Couplet']}\n"
-    return output
+    backend = _search_backend or await asyncio.to_thread(get_search_backend)
+    vectors = await backend.embeddings.aembed_queries(queries)
+    n = k if SEARCH_MODE == "vector" else FUSION_CANDIDATES
+    with span(type(backend).__name__, "vector_query", queries=len(queries)):
+        hits = await asyncio.to_thread(backend.search_by_vectors, vectors, n, ids)
+    return _fuse_batch(queries, [[m['id'] for m, _ in h] for h in hits], k, ids)
+
+async def asearch_kurals_batch(queries: List[str], paal: Optional[str] = None) -> str:
+    queries = _batch_queries(queries)
+    if not queries:
+        return "No queries given."
+    ids = get_kural_store().filter_ids(paal=paal) if paal else None
+    rankings = await arank_kurals_batch(queries, k=3 * len(queries), ids=ids)
+    return format_batch_results(queries, dedupe_rankings(rankings, 3))
+
+async def aget_kural_explanation(kural_id: int) -> str:
+    # In-memory lookup; no I/O to await
+    return get_kural_explanation.func(kural_id)
+
+async def arelated_kurals(kural_id: int) -> str:
+    return related_kurals.func(kural_id)
+
+async def afind_kural_by_verse(verse_text: str) -> str:
+    return find_kural_by_verse.func(verse_text)
+
+async def aget_random_kural_by_category(category: str) -> str:
+    return get_random_kural_by_category.func(category)
+
+search_kurals.coroutine = asearch_kurals
+search_kurals_batch.coroutine = asearch_kurals_batch
+get_kural_explanation.coroutine = aget_kural_explanation
+related_kurals.coroutine = arelated_kurals
+find_kural_by_verse.coroutine = afind_kural_by_verse
+get_random_kural_by_category.coroutine = aget_random_kural_by_category
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_ROOT = os.getenv("INDEX_ROOT", BASE_DIR)
+TRACE_LOG = os.getenv("TRACE_LOG", os.path.join(INDEX_ROOT, "traces", "traces.jsonl"))
+TRACING_ENABLED = os.getenv("TRACING", "1") == "1"
+# Serve Prometheus text metrics on this port when set
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Address the metrics server listens on; loopback unless a scraper on another host needs it
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+_current_trace = contextvars.ContextVar("thirukural_trace", default=None)
+
+
+class Trace:
+    """Spans recorded while answering one request. Spans may be added from worker
+    threads (LangGraph runs sync nodes in a pool), so appends are locked."""
+
+    def __init__(self, name: str, **attrs):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self.perf_start = time.perf_counter()
+        self.duration = None
+        self.spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def callbacks(self):
+        """LangChain callbacks that record LLM and tool calls into this trace."""
+        return [_make_callback_handler(self)]
+
+    def to_dict(self) -> Dict:
+        return {"trace_id": self.id, "name": self.name, "start": self.start,
+                "duration_s": self.duration, **self.attrs, "spans": self.spans}
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """Opens a trace for one request; on exit it is appended to the JSONL sink and
+    folded into the process metrics."""
+    t = Trace(name, **attrs)
+    token = _current_trace.set(t)
+    try:
+        yield t
+    finally:
+        t.duration = time.perf_counter() - t.perf_start
+        _current_trace.reset(token)
+        if TRACING_ENABLED:
+            _export(t)
+        METRICS.record(t)
+
+
+@contextmanager
+def span(name: str, kind: str, **attrs):
+    """Times a block inside the current trace. Yields a dict the caller can add
+    attributes to (token counts, cache hits). Cheap no-op outside a trace."""
+    t = _current_trace.get()
+    record = {"name": name, "kind": kind, **attrs}
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        if t is not None:
+            record["offset_s"] = started - t.perf_start
+            record["duration_s"] = time.perf_counter() - started
+            t.add(record)
+
+
+_export_lock = threading.Lock()
+
+
+def _export(t: Trace):
+    os.makedirs(os.path.dirname(TRACE_LOG), exist_ok=True)
+    line = json.dumps(t.to_dict(), ensure_ascii=False, default=str)
+    with _export_lock, open(TRACE_LOG, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def _make_callback_handler(t: Trace):
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TraceCallbackHandler(BaseCallbackHandler):
+        def __init__(self):
+            self._open = {}
+
+        def _start(self, run_id, name, kind):
+            self._open[run_id] = (name, kind, time.perf_counter())
+
+        def _finish(self, run_id, **attrs):
+            name, kind, started = self._open.pop(run_id, ("unknown", "unknown", time.perf_counter()))
+            t.add({"name": name, "kind": kind, "offset_s": started - t.perf_start,
+                   "duration_s": time.perf_counter() - started, **attrs})
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._start(run_id, (serialized or {}).get("name") or "chat_model", "llm")
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._start(run_id, (serialized or {}).get("name") or "llm", "llm")
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            usage = {}
+            try:
+                usage = response.generations[0][0].message.usage_metadata or {}
+            except (AttributeError, IndexError):
+                usage = ((response.llm_output or {}).get("token_usage") or {})
+            self._finish(run_id,
+                         input_tokens=usage.get("input_tokens", usage.get("prompt_tokens")),
+                         output_tokens=usage.get("output_tokens", usage.get("completion_tokens")))
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._finish(run_id, error=str(error))
+
+        def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+            self._start(run_id, (serialized or {}).get("name") or "tool", "tool")
+
+        def on_tool_end(self, output, *, run_id, **kwargs):
+            self._finish(run_id)
+
+        def on_tool_error(self, error, *, run_id, **kwargs):
+            self._finish(run_id, error=str(error))
+
+    return TraceCallbackHandler()
+
+
+class Metrics:
+    """Process-wide aggregates of finished traces, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.request_seconds = 0.0
+        self.span_count: Dict[tuple, int] = {}
+        self.span_seconds: Dict[tuple, float] = {}
+        self.tokens: Dict[tuple, int] = {}
+        self.cache: Dict[tuple, int] = {}
+
+    def record(self, t: Trace):
+        with self._lock:
+            self.requests += 1
+            self.request_seconds += t.duration or 0.0
+            for s in t.spans:
+                key = (s["kind"], s["name"])
+                self.span_count[key] = self.span_count.get(key, 0) + 1
+                self.span_seconds[key] = self.span_seconds.get(key, 0.0) + s.get("duration_s", 0.0)
+                for direction in ("input", "output"):
+                    n = s.get(f"{direction}_tokens")
+                    if n:
+                        tkey = (s["name"], direction)
+                        self.tokens[tkey] = self.tokens.get(tkey, 0) + n
+                if "cache_hit" in s:
+                    ckey = (s["name"], "hit" if s["cache_hit"] else "miss")
+                    self.cache[ckey] = self.cache.get(ckey, 0) + 1
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP thirukural_requests_total Chat turns traced.",
+                "# TYPE thirukural_requests_total counter",
+                f"thirukural_requests_total {self.requests}",
+                "# HELP thirukural_request_seconds_total Time spent answering chat turns.",
+                "# TYPE thirukural_request_seconds_total counter",
+                f"thirukural_request_seconds_total {self.request_seconds:.6f}",
+                "# HELP thirukural_span_total Spans recorded, by kind and name.",
+                "# TYPE thirukural_span_total counter",
+            ]
+            lines += [f'thirukural_span_total{{kind="{k}",name="{n}"}} {v}' for (k, n), v in self.span_count.items()]
+            lines += ["# HELP thirukural_span_seconds_total Time spent in spans, by kind and name.",
+                      "# TYPE thirukural_span_seconds_total counter"]
+            lines += [f'thirukural_span_seconds_total{{kind="{k}",name="{n}"}} {v:.6f}'
+                      for (k, n), v in self.span_seconds.items()]
+            lines += ["# HELP thirukural_tokens_total LLM tokens, by model and direction.",
+                      "# TYPE thirukural_tokens_total counter"]
+            lines += [f'thirukural_tokens_total{{name="{n}",direction="{d}"}} {v}' for (n, d), v in self.tokens.items()]
+            lines += ["# HELP thirukural_cache_total Cache lookups, by span and result.",
+                      "# TYPE thirukural_cache_total counter"]
+            lines += [f'thirukural_cache_total{{name="{n}",result="{r}"}} {v}' for (n, r), v in self.cache.items()]
+            return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+_server_started = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> bool:
+    """Serves /metrics on a daemon thread. Safe to call on every Streamlit rerun."""
+    global _server_started
+    if not port or _server_started:
+        return _server_started
+    with _server_lock:
+        if _server_started:
+            return True
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                found = self.path.startswith("/metrics")
+                body = METRICS.render_prometheus().encode("utf-8") if found else b""
+                self.send_response(200 if found else 404)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        _server_started = True
+    return True
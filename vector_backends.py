@@ -0,0 +1,257 @@
+import os
+import json
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_ROOT = os.getenv("INDEX_ROOT", BASE_DIR)
+NUMPY_INDEX_DIR = os.path.join(INDEX_ROOT, "vector_index")
+# Couplet and commentary chunks, quantized for the first search pass
+CHUNK_INDEX_DIR = os.path.join(INDEX_ROOT, "chunk_index")
+
+# "numpy" (default; the embedding matrix from the kural bundle), "chroma",
+# or "quantized" (couplets and commentaries, quantized first pass)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "numpy").lower()
+# First-pass encoding for the quantized backend: "int8" or "binary"
+QUANTIZATION = os.getenv("QUANTIZATION", "int8").lower()
+# Chunks re-scored at full precision per requested result
+RERANK_FACTOR = int(os.getenv("RERANK_FACTOR", "20"))
+
+# A search result: the kural's metadata and a cosine similarity (higher is closer)
+Hit = Tuple[Dict, float]
+
+
+class VectorBackend:
+    """Common interface for the retrieval backends. Queries are batched: one list of
+    hits is returned per query. `ids` optionally restricts results to those kural IDs."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def search_by_vectors(self, vectors: Sequence[Sequence[float]], k: int = 5,
+                          ids: Optional[Sequence[int]] = None) -> List[List[Hit]]:
+        raise NotImplementedError
+
+    def search(self, query: str, k: int = 5, ids: Optional[Sequence[int]] = None) -> List[Hit]:
+        return self.search_by_vectors([self.embeddings.embed_query(query)], k=k, ids=ids)[0]
+
+
+class ChromaBackend(VectorBackend):
+    def __init__(self, vectorstore):
+        super().__init__(vectorstore.embeddings)
+        self.vectorstore = vectorstore
+
+    def search_by_vectors(self, vectors, k=5, ids=None):
+        if ids is not None and not ids:
+            return [[] for _ in vectors]
+        where = {"id": {"$in": list(ids)}} if ids is not None else None
+        res = self.vectorstore._collection.query(
+            # chromadb rejects lists of numpy scalars; plain Python floats only
+            query_embeddings=np.asarray(vectors, dtype=np.float32).tolist(),
+            n_results=k,
+            where=where,
+            include=["metadatas", "distances"],
+        )
+        # Chroma returns squared L2 distance; on unit vectors cosine = 1 - d / 2
+        return [
+            [(m, 1.0 - d / 2.0) for m, d in zip(metas, dists)]
+            for metas, dists in zip(res["metadatas"], res["distances"])
+        ]
+
+
+class NumpyBackend(VectorBackend):
+    """Brute-force cosine search over a memory-mapped float32 matrix. At 1330 x 1536
+    this is a single ~8 MB matrix-vector product, cheaper than a Chroma round trip."""
+
+    def __init__(self, embeddings, index_dir: str = NUMPY_INDEX_DIR, matrix=None, metadatas=None):
+        super().__init__(embeddings)
+        if matrix is None:
+            matrix = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r")
+            with open(os.path.join(index_dir, "metadata.json"), encoding="utf-8") as f:
+                metadatas = json.load(f)
+        self.matrix = matrix
+        self.metadatas = metadatas
+        self.ids = np.array([m["id"] for m in self.metadatas])
+
+    @classmethod
+    def from_bundle(cls, embeddings, bundle) -> "NumpyBackend":
+        """Searches the bundle's memory-mapped matrix; row i belongs to the bundle's record i."""
+        from kural_store import record_metadata
+        return cls(embeddings, matrix=bundle.array("vectors"),
+                   metadatas=[record_metadata(r) for r in bundle.records()])
+
+    def search_by_vectors(self, vectors, k=5, ids=None):
+        queries = np.asarray(vectors, dtype=np.float32)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        scores = queries @ self.matrix.T
+
+        if ids is not None:
+            scores[:, ~np.isin(self.ids, list(ids))] = -np.inf
+
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, cand in zip(scores, top):
+            cand = cand[np.argsort(-row[cand])]
+            results.append([(self.metadatas[i], float(row[i])) for i in cand if np.isfinite(row[i])])
+        return results
+
+
+# Popcount of every byte value, for Hamming distance on packed sign bits
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def quantize_int8(matrix):
+    """Symmetric per-vector int8 codes and the scale that maps them back."""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def quantize_binary(matrix):
+    """One sign bit per dimension, packed eight to a byte."""
+    return np.packbits(matrix > 0, axis=1)
+
+
+class QuantizedBackend(VectorBackend):
+    """Searches every chunk (the couplet plus each commentary) in two passes: an
+    approximate scan over int8 or binary codes, then exact cosine re-ranking of the
+    shortlist against the full-precision vectors. The float32 matrix is memory-mapped,
+    so only the shortlisted rows are ever read. Chunks collapse to unique kural IDs,
+    each scored by its best chunk."""
+
+    def __init__(self, embeddings, index_dir: str = CHUNK_INDEX_DIR, quantization: str = QUANTIZATION,
+                 rerank_factor: int = RERANK_FACTOR):
+        super().__init__(embeddings)
+        from kural_store import get_kural_store, record_metadata
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.vectors = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r")
+        if quantization == "binary":
+            self.codes = np.load(os.path.join(index_dir, "codes_binary.npy"))
+        else:
+            self.codes = np.load(os.path.join(index_dir, "codes_int8.npy"))
+            self.scales = np.load(os.path.join(index_dir, "scales.npy"))
+        with open(os.path.join(index_dir, "chunks.json"), encoding="utf-8") as f:
+            self.chunks = json.load(f)
+        self.chunk_ids = np.array([c["id"] for c in self.chunks])
+        store = get_kural_store()
+        self.metadatas = {kid: record_metadata(store.get(kid)) for kid in set(self.chunk_ids.tolist())}
+
+    def memory_bytes(self) -> int:
+        """Bytes held in memory for the first pass (the mmapped float32 matrix is not counted)."""
+        total = self.codes.nbytes + self.chunk_ids.nbytes
+        return total + (self.scales.nbytes if self.quantization != "binary" else 0)
+
+    def approximate_scores(self, queries):
+        if self.quantization == "binary":
+            # Negated Hamming distance between sign bits; higher is closer
+            bits = quantize_binary(queries)
+            return -np.stack([_POPCOUNT[np.bitwise_xor(self.codes, b)].sum(axis=1, dtype=np.int32)
+                              for b in bits]).astype(np.float32)
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        # Row blocks bound the temporary float copy of the int8 codes
+        for start in range(0, len(self.codes), 4096):
+            block = self.codes[start:start + 4096].astype(np.float32)
+            scores[:, start:start + 4096] = (queries @ block.T) * self.scales[start:start + 4096]
+        return scores
+
+    def search_by_vectors(self, vectors, k=5, ids=None):
+        queries = np.asarray(vectors, dtype=np.float32)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        approx = self.approximate_scores(queries)
+        if ids is not None:
+            approx[:, ~np.isin(self.chunk_ids, list(ids))] = -np.inf
+
+        shortlist = min(k * self.rerank_factor, approx.shape[1])
+        results = []
+        for query, row in zip(queries, approx):
+            cand = np.argpartition(-row, shortlist - 1)[:shortlist]
+            cand = np.sort(cand[np.isfinite(row[cand])])
+            exact = np.asarray(self.vectors[cand]) @ query
+            best: Dict[int, float] = {}
+            for i, score in zip(cand.tolist(), exact.tolist()):
+                kid = int(self.chunk_ids[i])
+                if score > best.get(kid, -np.inf):
+                    best[kid] = score
+            top = sorted(best.items(), key=lambda item: -item[1])[:k]
+            results.append([(self.metadatas[kid], score) for kid, score in top])
+        return results
+
+
+def numpy_index_exists(index_dir: str = NUMPY_INDEX_DIR) -> bool:
+    return all(os.path.exists(os.path.join(index_dir, name)) for name in ("vectors.npy", "metadata.json"))
+
+
+def write_numpy_index(vectors, metadatas: List[Dict], index_dir: str = NUMPY_INDEX_DIR):
+    """Writes L2-normalized vectors and their metadata, sorted by kural ID."""
+    order = sorted(range(len(metadatas)), key=lambda i: metadatas[i]["id"])
+    matrix = np.asarray(vectors, dtype=np.float32)[order]
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    os.makedirs(index_dir, exist_ok=True)
+    meta_path = os.path.join(index_dir, "metadata.json")
+    vec_path = os.path.join(index_dir, "vectors.npy")
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump([metadatas[i] for i in order], f, ensure_ascii=False)
+    with open(vec_path + ".tmp", "wb") as f:
+        np.save(f, matrix)
+    os.replace(meta_path + ".tmp", meta_path)
+    os.replace(vec_path + ".tmp", vec_path)
+
+
+def export_numpy_index(vectorstore, index_dir: str = NUMPY_INDEX_DIR):
+    """Copies the ingest-time embeddings out of Chroma so the NumPy backend never re-embeds."""
+    data = vectorstore._collection.get(include=["embeddings", "metadatas"])
+    write_numpy_index(data["embeddings"], data["metadatas"], index_dir)
+
+
+def chunk_index_exists(index_dir: str = CHUNK_INDEX_DIR, commentaries: Optional[bool] = None) -> bool:
+    """True if the chunk index is complete and, when `commentaries` is given, was built
+    with (or without) commentary chunks to match, so toggling INDEX_COMMENTARIES rebuilds it."""
+    if not all(os.path.exists(os.path.join(index_dir, name))
+               for name in ("vectors.npy", "codes_int8.npy", "scales.npy", "codes_binary.npy", "chunks.json")):
+        return False
+    if commentaries is None:
+        return True
+    info_path = os.path.join(index_dir, "info.json")
+    if not os.path.exists(info_path):
+        return False
+    with open(info_path, encoding="utf-8") as f:
+        return json.load(f).get("commentaries") == commentaries
+
+
+def write_chunk_index(vectors, chunks: List[Dict], index_dir: str = CHUNK_INDEX_DIR):
+    """Writes normalized float32 vectors, their int8 and binary codes, and the chunk list
+    ({"id": kural ID, "source": "kural" or a commentary name}), ordered by kural ID.
+    info.json records whether any commentary chunks are included."""
+    order = sorted(range(len(chunks)), key=lambda i: (chunks[i]["id"], chunks[i]["source"]))
+    matrix = np.asarray(vectors, dtype=np.float32)[order]
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    codes, scales = quantize_int8(matrix)
+
+    os.makedirs(index_dir, exist_ok=True)
+    arrays = {"vectors.npy": matrix, "codes_int8.npy": codes, "scales.npy": scales,
+              "codes_binary.npy": quantize_binary(matrix)}
+    for name, array in arrays.items():
+        with open(os.path.join(index_dir, name + ".tmp"), "wb") as f:
+            np.save(f, array)
+    with open(os.path.join(index_dir, "chunks.json.tmp"), "w", encoding="utf-8") as f:
+        json.dump([chunks[i] for i in order], f)
+    with open(os.path.join(index_dir, "info.json.tmp"), "w", encoding="utf-8") as f:
+        json.dump({"commentaries": any(c["source"] != "kural" for c in chunks)}, f)
+    for name in [*arrays, "chunks.json", "info.json"]:
+        os.replace(os.path.join(index_dir, name + ".tmp"), os.path.join(index_dir, name))
+
+
+def export_chunk_index(vectorstore, commentary_store=None, index_dir: str = CHUNK_INDEX_DIR):
+    """Collects couplet vectors and, when indexed, commentary vectors from Chroma."""
+    vectors, chunks = [], []
+    for store in (vectorstore, commentary_store):
+        if store is None:
+            continue
+        data = store._collection.get(include=["embeddings", "metadatas"])
+        vectors.extend(data["embeddings"])
+        chunks.extend({"id": m["id"], "source": m.get("source", "kural")} for m in data["metadatas"])
+    write_chunk_index(vectors, chunks, index_dir)
@@ -0,0 +1,128 @@
+import os
+import re
+import json
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_ROOT = os.getenv("INDEX_ROOT", BASE_DIR)
+VERSE_INDEX_PATH = os.path.join(INDEX_ROOT, "verse_index.json")
+
+# Share of the query's trigrams a kural must contain to count as the verse the user
+# typed, and how far ahead of the runner-up it must be
+VERSE_MATCH_THRESHOLD = float(os.getenv("VERSE_MATCH_THRESHOLD", "0.6"))
+VERSE_MATCH_MARGIN = 0.15
+# Shorter queries (a word or two) match too many verses to identify one
+MIN_QUERY_TRIGRAMS = 8
+
+# Fields of a KuralStore record that are indexed: the verse (with <br /> already stripped) and its transliteration
+FIELDS = ("tamil_kural", "transliteration")
+
+_MARKUP_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile("[\u0B80-\u0BFF]+|[a-z]+")
+_REPEAT_RE = re.compile(r"([a-z])\1+")
+# Spellings that vary between transliterations of the same Tamil letter
+_LATIN_VARIANTS = (("dh", "th"), ("zh", "l"), ("w", "v"), ("ee", "i"), ("oo", "u"))
+
+
+def normalize(text: str) -> str:
+    """Tamil letters and transliteration reduced to one space-separated form: markup
+    and punctuation dropped, Latin diacritics removed, and doubled letters and common
+    spelling variants folded so "Ezhuththellaam" and "eluthelam" agree."""
+    text = _MARKUP_RE.sub(" ", str(text)).casefold()
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c) or c >= "\u0B80")
+    words = []
+    for word in _WORD_RE.findall(unicodedata.normalize("NFC", text)):
+        if word[0] < "\u0B80":
+            for old, new in _LATIN_VARIANTS:
+                word = word.replace(old, new)
+            word = _REPEAT_RE.sub(r"\1", word)
+        words.append(word)
+    return " ".join(words)
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f" {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} if padded.strip() else set()
+
+
+class VerseIndex:
+    """Character-trigram inverted index over the verse text, for identifying a kural
+    from a partial, misspelled or transliterated line of it."""
+
+    def __init__(self, ids: List[int], postings: Dict[str, List[int]], doc_sizes: List[int]):
+        self.ids = ids
+        self.postings = postings
+        self.doc_sizes = doc_sizes
+        self._position = {kid: doc for doc, kid in enumerate(ids)}
+        # Posting lists as arrays, so a lookup is one concatenate and one bincount
+        self._arrays = {gram: np.asarray(docs, dtype=np.int32) for gram, docs in postings.items()}
+        # Among equal match counts the shorter verse wins: it is more fully covered
+        self._tiebreak = 1.0 - np.asarray(doc_sizes, dtype=np.float64) / (max(doc_sizes, default=0) + 1)
+
+    @classmethod
+    def build(cls, records: Iterable[Dict]) -> "VerseIndex":
+        ids, doc_sizes, postings = [], [], {}
+        for doc, r in enumerate(records):
+            grams = set().union(*(trigrams(r[field]) for field in FIELDS))
+            ids.append(r["id"])
+            doc_sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(doc)
+        return cls(ids, postings, doc_sizes)
+
+    def save(self, path: str = VERSE_INDEX_PATH):
+        # Sessions that find the index missing also build and save it, so each writer needs its own temp file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "doc_sizes": self.doc_sizes, "postings": self.postings}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = VERSE_INDEX_PATH) -> "VerseIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls.loads(f.read())
+
+    @classmethod
+    def loads(cls, text) -> "VerseIndex":
+        data = json.loads(text)
+        return cls(data["ids"], data["postings"], data["doc_sizes"])
+
+    def search(self, text: str, k: int = 3, ids: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        """Up to k (kural_id, score) pairs, best first. The score is the share of the
+        query's trigrams found in the kural, so a correct fragment scores near 1 however
+        short it is relative to the whole verse; ties go to the shorter verse."""
+        return self._rank(trigrams(text), k, ids)
+
+    def _rank(self, grams: Set[str], k: int, ids: Optional[Sequence[int]]) -> List[Tuple[int, float]]:
+        found = [self._arrays[gram] for gram in grams if gram in self._arrays]
+        if not found:
+            return []
+        counts = np.bincount(np.concatenate(found), minlength=len(self.ids)).astype(np.float64)
+        if ids is not None:
+            mask = np.zeros(len(self.ids), dtype=bool)
+            mask[[self._position[kid] for kid in ids if kid in self._position]] = True
+            counts[~mask] = 0
+        keys = counts + self._tiebreak * (counts > 0)
+        top = np.argpartition(-keys, min(k, len(keys) - 1))[:k]
+        top = top[np.argsort(-keys[top])]
+        return [(self.ids[doc], float(counts[doc] / len(grams))) for doc in top.tolist() if counts[doc] > 0]
+
+    def identify(self, text: str, ids: Optional[Sequence[int]] = None) -> Optional[int]:
+        """The kural `text` quotes, or None unless one verse matches clearly better than any other."""
+        grams = trigrams(text)
+        if len(grams) < MIN_QUERY_TRIGRAMS:
+            return None
+        hits = self._rank(grams, 2, ids)
+        if not hits or hits[0][1] < VERSE_MATCH_THRESHOLD:
+            return None
+        if len(hits) > 1 and hits[0][1] - hits[1][1] < VERSE_MATCH_MARGIN:
+            return None
+        return hits[0][0]
+
+
+def verse_index_exists(path: str = VERSE_INDEX_PATH) -> bool:
+    return os.path.exists(path)